@@ -0,0 +1,49 @@
+import ffmpeg
+import numpy as np
+
+# Whisper works on 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+
+# Read the duration of a media file in seconds
+def probe_duration(path):
+    return float(ffmpeg.probe(path)['format']['duration'])
+
+
+# Convert raw 16-bit PCM bytes to the float32 samples Whisper expects
+def pcm_to_float32(pcm_bytes):
+    return np.frombuffer(pcm_bytes, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+# Decode a whole input's audio as 16 kHz mono samples through an ffmpeg pipe, without touching disk.
+# stream_index picks a specific audio stream instead of ffmpeg's default choice.
+def load_audio_pcm(path, sample_rate=SAMPLE_RATE, stream_index=None):
+    source = ffmpeg.input(path)
+    if stream_index is not None:
+        source = source[str(stream_index)]
+    out, _ = (
+        source
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=sample_rate)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return pcm_to_float32(out)
+
+
+# Decode one window of audio as 16 kHz mono samples; source is a media path or an already decoded buffer
+def read_audio_window(source, start, duration, sample_rate=SAMPLE_RATE):
+    if isinstance(source, np.ndarray):
+        first = int(start * sample_rate)
+        return source[first:first + int(duration * sample_rate)]
+    out, _ = (
+        ffmpeg.input(source, ss=start, t=duration)
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=sample_rate)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return pcm_to_float32(out)
+
+
+# Duration in seconds of a media path or a decoded 16 kHz buffer
+def audio_duration(source, sample_rate=SAMPLE_RATE):
+    if isinstance(source, np.ndarray):
+        return len(source) / sample_rate
+    return probe_duration(source)
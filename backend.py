@@ -1,278 +1,793 @@
-import os
-import whisper
-import ffmpeg
-import openai
-from textblob import TextBlob
-import concurrent.futures
-import psycopg2
-import yt_dlp as youtube_dl
-from moviepy.editor import VideoFileClip
-import re
-
-# Set your API key for OpenAI
-openai.api_key_path = "C:/Users/Lenovo/Desktop/PROJECT/api_key.env"
-
-# Load Whisper model once for reuse
-whisper_model = whisper.load_model("base")
-
-# Database connection
-def connect_db():
-    return psycopg2.connect(
-        host="localhost",
-        database="registration",
-        user="arya_nigam",
-        password="123456"
-    )
-
-# Helper function to insert user into the database
-def register_user(data):
-    conn = connect_db()
-    cur = conn.cursor()
-    query = """
-    INSERT INTO users_credentials (username, email, password, phone, dob, role, gender, profile_picture)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    cur.execute(query, data)
-    conn.commit()
-    conn.close()
-
-# Helper function to insert user into the database
-def register_user(data):
-    conn = connect_db()
-    cur = conn.cursor()
-    query = """
-    INSERT INTO users_credentials (username, email, password, phone, dob, role, gender, profile_picture)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    # Ensure binary data is passed correctly
-    cur.execute(query, data)
-    conn.commit()
-    conn.close()
-
-
-# User authentication function
-def authenticate_user(email, password):
-    conn = connect_db()
-    cur = conn.cursor()
-    query = "SELECT username, email, role FROM users_credentials WHERE email = %s AND password = %s"
-    cur.execute(query, (email, password))
-    user_data = cur.fetchone()
-    conn.close()
-    if user_data:
-        return {"username": user_data[0], "email": user_data[1], "role": user_data[2]}
-    return None
-
-# Password validation function
-def validate_password(password):
-    password_regex = r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$'
-    return bool(re.match(password_regex, password))
-
-# Email validation function
-def validate_email(email):
-    email_regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-    return bool(re.match(email_regex, email))
-
-# Phone number validation function
-def validate_phone(phone):
-    phone_regex = r'^[9876]\d{9}$'
-    return bool(re.match(phone_regex, phone))
-
-# Step 1: Extract Audio from Video using FFmpeg
-def extract_audio(video_path, output_audio_path):
-    try:
-        ffmpeg.input(video_path).output(output_audio_path).run(overwrite_output=True)
-        print(f"Audio extracted successfully to {output_audio_path}")
-    except Exception as e:
-        print(f"Error extracting audio: {e}")
-
-# Step 2: Transcribe Audio to Text with Segment-Level Timestamps using Whisper
-def transcribe_audio_with_segment_timestamps(audio_path):
-    result = whisper_model.transcribe(audio_path, verbose=True)
-
-    transcription_with_timestamps = []
-    full_text = []
-    for segment in result['segments']:
-        transcription_with_timestamps.append({
-            'start': segment['start'],
-            'end': segment['end'],
-            'text': segment['text'].strip()
-        })
-        full_text.append(segment['text'].strip())
-
-    return transcription_with_timestamps, " ".join(full_text)
-
-# Step 3: Identify Video Genre
-def identify_genre(transcription_segments):
-    sample_text = " ".join([segment['text'] for segment in transcription_segments[:5]])
-
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "system", "content": "You are an AI trained to identify video genres."},
-                  {"role": "user", "content": f"Identify the genre of this video based on the following text: '{sample_text}'"}],
-        temperature=0.2
-    )
-
-    genre = response.choices[0].message['content'].strip().lower()
-    return genre
-
-# Step 4: Analyze Importance of the Full Transcribed Text
-def analyze_importance_of_transcribed_text(transcribed_text, genre):
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "system", "content": f"You are selecting important moments for a {genre} video highlight reel."},
-                  {"role": "user", "content": f"Analyze the transcript and extract as many important moments as possible, focusing on detailed, granular segments for a {genre} video. Text: '{transcribed_text}'"}
-],
-        max_tokens=500,
-    )
-    
-    importance = response.choices[0].message['content'].strip().lower()
-    return importance
-
-# Step 5: Analyze Sentiment of Transcriptions
-def analyze_sentiment(text):
-    blob = TextBlob(text)
-    return blob.sentiment.polarity  # Return only polarity for simplicity
-
-
-# Step 6: Identify and Compile Important Segments
-def identify_and_compile_important_segments(transcription_segments, genre, max_duration=100):
-    transcribed_text = " ".join(segment['text'] for segment in transcription_segments)
-    important_text = analyze_importance_of_transcribed_text(transcribed_text, genre)
-
-    important_segments = []
-    total_duration = 0
-
-    # Lower the sentiment threshold to 0.1 to allow more segments to pass
-    for segment in transcription_segments:
-        segment_keywords = [keyword for keyword in important_text.split() if keyword in segment['text'].lower()]
-        sentiment = analyze_sentiment(segment['text'])
-        
-        # Lower the sentiment threshold to 0.1
-        if segment_keywords and sentiment > 0.1:
-            segment_duration = segment['end'] - segment['start']
-            if total_duration + segment_duration <= max_duration:
-                important_segments.append(segment)
-                total_duration += segment_duration
-                print(f"Added important segment: {segment['text']}")
-
-    print(f"Total important segments selected: {len(important_segments)}")
-    return important_segments
-
-# Step 6: Create and Compile Highlight Reels
-def create_segment(video_path, segment, output_dir="segments"):
-    try:
-        segment_duration = segment['end'] - segment['start']
-        segment_file = os.path.join(output_dir, f"segment_{segment['start']:.2f}_{segment['end']:.2f}.mp4")
-        ffmpeg.input(video_path, ss=segment['start'], to=segment['end']).output(segment_file, c='copy').run(overwrite_output=True)
-        return segment_file
-    except Exception as e:
-        print(f"Error creating segment file: {e}")
-        return None
-
-def create_highlight_reels(video_path, important_segments, min_reels=3, max_reel_duration=30):
-    segment_files = []
-    reels = []
-    output_dir = "segments"
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Parallelize segment extraction
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_segment = {executor.submit(create_segment, video_path, segment): segment for segment in important_segments}
-        for future in concurrent.futures.as_completed(future_to_segment):
-            segment = future_to_segment[future]
-            segment_file = future.result()
-            if segment_file:
-                segment_files.append(segment_file)
-
-    # Distribute segments into reels
-    reels = [segment_files[i::min_reels] for i in range(min_reels)]
-
-    reel_paths = []
-    for i, reel_segments in enumerate(reels):
-        reel_list_file = create_reel_list_file(reel_segments, i + 1)
-        reel_path = f"highlight_reel_{i + 1}.mp4"
-        try:
-            ffmpeg.input(reel_list_file, format='concat', safe=0).output(reel_path, c='copy').run(overwrite_output=True)
-            reel_paths.append(reel_path)
-        except Exception as e:
-            print(f"Error creating reel {i + 1}: {e}")
-    return reel_paths
-
-def create_reel_list_file(reel_segments, reel_index):
-    reel_list_file = f"reel_{reel_index}_list.txt"
-    with open(reel_list_file, "w") as f:
-        for segment in reel_segments:
-            f.write(f"file '{os.path.abspath(segment)}'\n")
-    return reel_list_file
-
-# Step 7: Add Subtitles to Video
-def add_subtitles_to_video(video_path, subtitle_segments, output_video_path):
-    subtitle_file = "subtitles.srt"
-    
-    # Create SRT file
-    with open(subtitle_file, "w") as f:
-        for idx, segment in enumerate(subtitle_segments):
-            start_time = segment['start']
-            end_time = segment['end']
-            text = segment['text']
-            f.write(f"{idx+1}\n")
-            f.write(f"{format_time(start_time)} --> {format_time(end_time)}\n")
-            f.write(f"{text}\n\n")
-    
-    # Use ffmpeg to add subtitles
-    ffmpeg.input(video_path).output(output_video_path, vf=f"subtitles={subtitle_file}").run(overwrite_output=True)
-
-# Convert seconds to HH:MM:SS,MS format for SRT file
-def format_time(seconds):
-    mins, sec = divmod(seconds, 60)
-    hour, mins = divmod(mins, 60)
-    return f"{int(hour):02}:{int(mins):02}:{int(sec):02},{int((sec % 1) * 1000):03}"
-
-# Full Process: Extract audio, transcribe, identify important segments, and add subtitles
-def process_video_to_reels(video_path):
-    audio_path = 'output_audio.wav'
-    extract_audio(video_path, audio_path)
-
-    transcription_segments, full_text = transcribe_audio_with_segment_timestamps(audio_path)
-    genre = identify_genre(transcription_segments)
-
-    important_segments = identify_and_compile_important_segments(transcription_segments, genre)
-
-    reel_paths = create_highlight_reels(video_path, important_segments)
-
-    output_video_path = "highlight_video_with_subtitles.mp4"
-    add_subtitles_to_video(video_path, important_segments, output_video_path)
-
-    # Save transcription to file
-    transcription_file_path = "transcription.txt"
-    with open(transcription_file_path, "w") as file:
-        file.write(full_text)
-
-    return reel_paths, output_video_path, transcription_file_path
-
-# Function to download video from YouTube
-def download_video_from_youtube(youtube_url, output_dir="downloaded_videos"):
-    try:
-        # Set up the download options
-        ydl_opts = {
-            'format': 'best',
-            'outtmpl': f'{output_dir}/%(title)s.%(ext)s',
-            'quiet': True,
-        }
-        os.makedirs(output_dir, exist_ok=True)
-        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(youtube_url, download=True)
-            video_path = os.path.join(output_dir, f"{info['title']}.{info['ext']}")
-            return video_path
-    except Exception as e:
-        print(f"Error downloading video: {e}")
-        return None
-
-def get_user_data(email):
-    conn = connect_db()
-    cur = conn.cursor()
-    query = "SELECT username, email, dob, role, gender, profile_picture FROM users_credentials WHERE email = %s"
-    cur.execute(query, (email,))
-    user_data = cur.fetchone()
-    conn.close()
-    return user_data
+import contextvars
+import os
+import json
+import ffmpeg
+import re
+import threading
+from transcription_cache import TranscriptionCache
+from audio_io import SAMPLE_RATE, audio_duration, load_audio_pcm, read_audio_window
+from sharded_transcription import transcribe_sharded
+from llm_client import get_llm_client, set_openai_api_key_path
+from model_registry import ASR_BACKEND, WHISPER_MODEL_NAME, asr_model_id, transcribe_with_whisper
+from vad import SpeechTimeline, compact_speech, detect_speech
+from importance_map_reduce import analyze_importance_map_reduce, score_chunk
+from batch_scoring import count_tokens, format_segment_line
+from keyword_index import SegmentKeywordIndex
+from sentiment import analyze_sentiment_batch
+from highlight_selection import select_highlights
+from segment_cutter import cut_segments, cut_single_segment, segment_output_path
+from smart_cut import probe_keyframes, smart_cut_segment, smart_cut_segments, video_encode_params
+from media_index import encode_params, load_media_index
+from job_workspace import JobWorkspace
+from checkpoints import StageCheckpoints
+from pipeline import Stage, format_stage_report, run_pipeline
+from instrumentation import JobMetrics, instrumented, measure_stage, record_pipeline_stats
+from video_downloads import DOWNLOAD_DIR, DownloadManager, downloaded_audio_for, get_download_manager
+
+# Set your API key for OpenAI (applied when the OpenAI client is first used)
+set_openai_api_key_path("C:/Users/Lenovo/Desktop/PROJECT/api_key.env")
+
+# Whisper, OpenAI, yt_dlp and psycopg2 are imported where they are first used, and the
+# Whisper model is loaded by model_registry on first transcription (or served by a shared model
+# server), so importing backend for the UI's helper functions stays cheap
+
+# Options that change Whisper's output; they are part of the transcription cache key
+TRANSCRIBE_OPTIONS = {}
+transcription_cache = TranscriptionCache()
+
+# Streaming transcription settings; audio longer than STREAMING_MIN_DURATION is transcribed window by window
+STREAM_WINDOW_SECONDS = 30.0
+STREAM_OVERLAP_SECONDS = 5.0
+STREAMING_MIN_DURATION = 600.0
+
+# Decoded audio up to this size stays in memory; larger inputs go through a per-job temp WAV
+IN_MEMORY_AUDIO_MAX_BYTES = 256 * 1024 * 1024
+
+# Number of worker processes for sharded transcription; 1 keeps the in-process model
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+
+# Voice-activity pre-pass: silence and music are cut out before Whisper runs and segment timestamps are
+# mapped back to the source. Audio where it would skip less than VAD_MIN_SKIP_FRACTION is transcribed whole.
+# Sharded transcription plans its own shards on silences and doesn't use it.
+VAD_ENABLED = os.getenv("VAD", "1") == "1"
+VAD_MIN_SKIP_FRACTION = 0.05
+
+# "lexicon" for vectorized batch scoring, "textblob" for the original per-segment analysis
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "lexicon")
+
+# Highlight selection constraints; MAX_HIGHLIGHT_DURATION is the seconds of highlights picked across all reels
+MAX_HIGHLIGHT_DURATION = 100
+MIN_REELS = 3
+MAX_SEGMENTS_PER_REEL = 10
+MIN_SEGMENT_GAP = 0.0
+
+# "copy" stream-copies segments (cuts snap to keyframes), "reencode" cuts frame-accurately,
+# "smart" is frame-accurate but only re-encodes the partial GOPs at each segment edge
+SEGMENT_CUT_MODE = os.getenv("SEGMENT_CUT_MODE", "smart")
+
+# "burn" renders captions into each reel, "soft" muxes them as a subtitle track without re-encoding
+SUBTITLE_MODE = os.getenv("SUBTITLE_MODE", "burn")
+
+# Run transcription, scoring and cutting as concurrent stages joined by bounded queues
+PIPELINED_EXECUTION = os.getenv("PIPELINED_EXECUTION", "1") == "1"
+# Transcript tokens scored per LLM call in pipelined mode; small chunks let cutting start early
+PIPELINE_CHUNK_TOKEN_BUDGET = 800
+
+# Database connection
+def connect_db():
+    import psycopg2
+
+    return psycopg2.connect(
+        host="localhost",
+        database="registration",
+        user="arya_nigam",
+        password="123456"
+    )
+
+# Helper function to insert user into the database
+def register_user(data):
+    conn = connect_db()
+    cur = conn.cursor()
+    query = """
+    INSERT INTO users_credentials (username, email, password, phone, dob, role, gender, profile_picture)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    cur.execute(query, data)
+    conn.commit()
+    conn.close()
+
+# Helper function to insert user into the database
+def register_user(data):
+    conn = connect_db()
+    cur = conn.cursor()
+    query = """
+    INSERT INTO users_credentials (username, email, password, phone, dob, role, gender, profile_picture)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    # Ensure binary data is passed correctly
+    cur.execute(query, data)
+    conn.commit()
+    conn.close()
+
+
+# User authentication function
+def authenticate_user(email, password):
+    conn = connect_db()
+    cur = conn.cursor()
+    query = "SELECT username, email, role FROM users_credentials WHERE email = %s AND password = %s"
+    cur.execute(query, (email, password))
+    user_data = cur.fetchone()
+    conn.close()
+    if user_data:
+        return {"username": user_data[0], "email": user_data[1], "role": user_data[2]}
+    return None
+
+# Password validation function
+def validate_password(password):
+    password_regex = r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$'
+    return bool(re.match(password_regex, password))
+
+# Email validation function
+def validate_email(email):
+    email_regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
+    return bool(re.match(email_regex, email))
+
+# Phone number validation function
+def validate_phone(phone):
+    phone_regex = r'^[9876]\d{9}$'
+    return bool(re.match(phone_regex, phone))
+
+# Step 1: Extract Audio from Video using FFmpeg (16 kHz mono, the format Whisper resamples to anyway)
+@instrumented("extract_audio")
+def extract_audio(video_path, output_audio_path):
+    try:
+        audio = load_media_index(video_path)['audio']
+        source = ffmpeg.input(video_path)
+        if audio is not None:
+            source = source[str(audio['index'])]
+        source.output(output_audio_path, ac=1, ar=SAMPLE_RATE).run(overwrite_output=True)
+        print(f"Audio extracted successfully to {output_audio_path}")
+    except Exception as e:
+        print(f"Error extracting audio: {e}")
+
+# Step 1 (in memory): Decode audio straight into a NumPy buffer, falling back to a WAV in the job workspace for very large inputs.
+# Returns the audio source for the transcriber and the temp file to clean up, if any.
+@instrumented("load_audio")
+def load_audio_for_transcription(video_path, workspace):
+    media_index = load_media_index(video_path)
+    if media_index['audio'] is None:
+        raise ValueError(f"{video_path} has no audio stream to transcribe")
+    if media_index['duration'] * SAMPLE_RATE * 4 <= IN_MEMORY_AUDIO_MAX_BYTES:
+        return load_audio_pcm(video_path, stream_index=media_index['audio']['index']), None
+
+    audio_path = workspace.temp_path("audio.wav")
+    extract_audio(video_path, audio_path)
+    return audio_path, audio_path
+
+# Step 1b: Voice-activity pre-pass. Returns the audio to transcribe, holding only the speech regions, and the
+# SpeechTimeline that maps its timestamps back to the source; or the audio unchanged and None when too little
+# would be skipped. Skipped fraction and estimated speedup go to the job's metrics.
+def compact_audio_to_speech(audio, workspace):
+    with measure_stage("vad") as stage:
+        duration = audio_duration(audio)
+        timeline = SpeechTimeline(detect_speech(audio))
+        skipped = 1.0 - timeline.speech_duration / duration if duration else 0.0
+        stage.items = len(timeline.regions)
+        stage.details.update(audio_seconds=round(duration, 2), speech_seconds=round(timeline.speech_duration, 2),
+                             skipped_fraction=round(skipped, 4))
+        # No speech at all more likely means quiet or unusual audio than an empty video
+        if not timeline.regions or skipped < VAD_MIN_SKIP_FRACTION:
+            print(f"VAD: {skipped:.1%} of the audio is silence or music, transcribing all of it")
+            return audio, None
+        # Large inputs are already on disk; keep the compacted copy there too
+        output_path = workspace.temp_path("speech.wav") if isinstance(audio, str) else None
+        speech = compact_speech(audio, timeline, output_path)
+        speedup = duration / timeline.compact_duration
+        stage.details['estimated_speedup'] = round(speedup, 2)
+    print(f"VAD: skipping {skipped:.1%} of {duration:.0f}s of audio ({len(timeline.regions)} speech regions), "
+          f"estimated transcription speedup {speedup:.2f}x")
+    return speech, timeline
+
+# Step 2: Transcribe Audio to Text with Segment-Level Timestamps using Whisper (audio is a file path or a 16 kHz buffer).
+# timeline maps timestamps of audio compacted by the VAD pre-pass back to the source.
+@instrumented("transcription", items=lambda result: len(result[0]))
+def transcribe_audio_with_segment_timestamps(audio, streaming=False, workers=1, asr_backend=ASR_BACKEND, timeline=None):
+    if workers > 1:
+        segments = transcribe_sharded(audio, WHISPER_MODEL_NAME, workers, TRANSCRIBE_OPTIONS, asr_backend=asr_backend)
+    elif streaming:
+        segments = transcribe_audio_streaming(audio, asr_backend=asr_backend)
+    else:
+        result = transcribe_with_whisper(audio, WHISPER_MODEL_NAME, asr_backend, verbose=True, **TRANSCRIBE_OPTIONS)
+        segments = result['segments']
+    if timeline is not None:
+        segments = timeline.remap_segments(segments)
+
+    transcription_with_timestamps = []
+    full_text = []
+    for segment in segments:
+        transcription_with_timestamps.append({
+            'start': segment['start'],
+            'end': segment['end'],
+            'text': segment['text'].strip()
+        })
+        full_text.append(segment['text'].strip())
+
+    return transcription_with_timestamps, " ".join(full_text)
+
+# Step 2 (streaming): Transcribe fixed windows with overlap and yield segments as each window finishes.
+# Only one window of audio is decoded at a time, so memory stays flat regardless of duration.
+def transcribe_audio_streaming(audio, window_seconds=STREAM_WINDOW_SECONDS, overlap_seconds=STREAM_OVERLAP_SECONDS,
+                               asr_backend=ASR_BACKEND):
+    if not 0 <= overlap_seconds < window_seconds:
+        raise ValueError("overlap_seconds must be non-negative and shorter than window_seconds")
+
+    duration = audio_duration(audio)
+    step = window_seconds - overlap_seconds
+    window_start = 0.0
+    owned_from = 0.0
+    last_end = 0.0
+    last_text = None
+
+    while window_start < duration:
+        window_end = min(window_start + window_seconds, duration)
+        window_audio = read_audio_window(audio, window_start, window_end - window_start)
+        if window_audio.size == 0:
+            break
+        result = transcribe_with_whisper(window_audio, WHISPER_MODEL_NAME, asr_backend, **TRANSCRIBE_OPTIONS)
+
+        # Each window owns the segments whose midpoint lies before the middle of its trailing
+        # overlap; anything later is re-transcribed by the next window with full context.
+        is_last_window = window_end >= duration
+        owned_until = duration if is_last_window else window_end - overlap_seconds / 2
+        for segment in result['segments']:
+            text = segment['text'].strip()
+            start = window_start + segment['start']
+            end = min(window_start + segment['end'], window_end)
+            midpoint = (start + end) / 2
+            if not text or midpoint < owned_from or midpoint >= owned_until:
+                continue
+            # Drop a boundary segment the previous window already emitted
+            if text == last_text and start < last_end:
+                continue
+            start = max(start, last_end)
+            if end <= start:
+                continue
+            yield {'start': start, 'end': end, 'text': text}
+            last_end = end
+            last_text = text
+
+        if is_last_window:
+            break
+        owned_from = owned_until
+        window_start += step
+
+# Step 3: Identify Video Genre
+def identify_genre(transcription_segments):
+    sample = transcription_segments[:5]
+    sample_text = " ".join([segment['text'] for segment in sample])
+
+    # The stage's items are the segments sampled, not the whole transcript
+    with measure_stage("genre") as stage:
+        stage.items = len(sample)
+        content = get_llm_client().complete(
+            [{"role": "system", "content": "You are an AI trained to identify video genres."},
+             {"role": "user", "content": f"Identify the genre of this video based on the following text: '{sample_text}'"}],
+            model="gpt-3.5-turbo",
+            temperature=0.2,
+            allow_nondeterministic=True
+        )
+
+    genre = content.lower()
+    return genre
+
+# Combine the model's highlights with keyword and sentiment scores. indexed_segments is a list of
+# (transcript index, segment); returns (index, segment with its score) for the segments that pass the filter.
+def score_candidate_segments(indexed_segments, highlights):
+    highlight_scores = {highlight['index']: highlight['score'] for highlight in highlights}
+    segments = [segment for _, segment in indexed_segments]
+    # Score keyword matches for every segment at once through an inverted index
+    keyword_index = SegmentKeywordIndex(segments)
+    keyword_scores = keyword_index.score(keyword for highlight in highlights for keyword in highlight['keywords'])
+
+    # Sentiment for every segment in one batch
+    sentiments = analyze_sentiment_batch((segment['text'] for segment in segments), SENTIMENT_BACKEND)
+
+    # Lower the sentiment threshold to 0.1 to allow more segments to pass
+    candidates = []
+    for position, (index, segment) in enumerate(indexed_segments):
+        sentiment = sentiments[position]
+        if (index in highlight_scores or keyword_scores[position] > 0) and sentiment > 0.1:
+            score = highlight_scores.get(index, 0.0) + keyword_scores[position] + float(sentiment)
+            candidates.append((index, dict(segment, score=score)))
+    return candidates
+
+# Step 6: Identify and Compile Important Segments
+@instrumented("selection", items=len)
+def identify_and_compile_important_segments(transcription_segments, genre, max_duration=MAX_HIGHLIGHT_DURATION,
+                                            min_gap=MIN_SEGMENT_GAP, max_segments=MAX_SEGMENTS_PER_REEL * MIN_REELS,
+                                            highlights=None):
+    # Map-reduce over token-sized chunks so long transcripts are never truncated
+    if highlights is None:
+        highlights = analyze_importance_map_reduce(transcription_segments, genre)
+    candidates = [candidate for _, candidate in score_candidate_segments(list(enumerate(transcription_segments)), highlights)]
+
+    # Best total score under the duration budget, rather than the first segments that fit
+    important_segments = select_highlights(candidates, max_duration, min_gap=min_gap, max_segments=max_segments)
+    for segment in important_segments:
+        print(f"Added important segment: {segment['text']}")
+
+    print(f"Total important segments selected: {len(important_segments)}")
+    return important_segments
+
+# Step 6: Create and Compile Highlight Reels
+def create_highlight_reels(video_path, important_segments, min_reels=MIN_REELS, max_reel_duration=30,
+                           subtitle_mode=SUBTITLE_MODE, highlight_video_path=None, workspace=None):
+    # A workspace created here is this call's own: its scratch files go when it returns, the reels stay
+    owned = workspace is None
+    workspace = workspace or JobWorkspace()
+    succeeded = False
+    try:
+        cut_pieces = cut_highlight_segments(video_path, important_segments, workspace)
+        reel_paths = assemble_highlight_reels(video_path, cut_pieces, workspace, min_reels, subtitle_mode,
+                                              highlight_video_path)
+        succeeded = True
+        return reel_paths
+    finally:
+        if owned:
+            workspace.cleanup(succeeded=succeeded)
+
+# Cut every segment into the workspace; returns (segment, file) for the segments that were cut
+@instrumented("cut", items=len)
+def cut_highlight_segments(video_path, important_segments, workspace):
+    output_dir = workspace.temp_path("segments")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Cut all segments in as few ffmpeg passes as possible, or frame-accurately with smart cutting
+    if SEGMENT_CUT_MODE == "smart":
+        cut_files = smart_cut_segments(video_path, important_segments, output_dir)
+    else:
+        cut_files = cut_segments(video_path, important_segments, output_dir, mode=SEGMENT_CUT_MODE)
+    return [(segment, segment_file) for segment, segment_file in zip(important_segments, cut_files) if segment_file]
+
+# Build the reels (and optionally the full highlight video) from already cut (segment, file) pieces
+@instrumented("compile_reels", items=len)
+def assemble_highlight_reels(video_path, cut_pieces, workspace, min_reels=MIN_REELS, subtitle_mode=SUBTITLE_MODE,
+                             highlight_video_path=None):
+    # Distribute segments into reels
+    reels = [cut_pieces[i::min_reels] for i in range(min_reels)]
+
+    reel_paths = []
+    for i, reel_pieces in enumerate(reels):
+        if not reel_pieces:
+            continue
+        reel_path = workspace.output_path(f"highlight_reel_{i + 1}.mp4")
+        try:
+            compile_reel(video_path, reel_pieces, reel_path, workspace.temp_path(f"reel_{i + 1}"), subtitle_mode)
+            reel_paths.append(reel_path)
+        except Exception as e:
+            print(f"Error creating reel {i + 1}: {e}")
+
+    # The full highlight video is every cut segment in order, captioned the same way as the reels
+    if highlight_video_path and cut_pieces:
+        try:
+            compile_reel(video_path, cut_pieces, highlight_video_path, workspace.temp_path("highlight_video"), subtitle_mode)
+        except Exception as e:
+            print(f"Error creating highlight video: {e}")
+    return reel_paths
+
+def create_reel_list_file(reel_segments, name):
+    reel_list_file = f"{name}_list.txt"
+    with open(reel_list_file, "w") as f:
+        for segment in reel_segments:
+            f.write(f"file '{os.path.abspath(segment)}'\n")
+    return reel_list_file
+
+# Concatenate cut segments into one output. Captions are re-timed to the output's own timeline and
+# either burned in (re-encoding only this output) or muxed as a soft subtitle track (no re-encode).
+# name is the path prefix for the output's list and subtitle files.
+def compile_reel(video_path, reel_pieces, output_path, name, subtitle_mode=None):
+    reel_list_file = create_reel_list_file([segment_file for _, segment_file in reel_pieces], name)
+    source = ffmpeg.input(reel_list_file, format='concat', safe=0)
+    if subtitle_mode not in ("burn", "soft"):
+        source.output(output_path, c='copy').run(overwrite_output=True)
+        return output_path
+
+    subtitle_file = f"{name}_subtitles.srt"
+    write_srt(retime_captions(reel_pieces), subtitle_file)
+    if subtitle_mode == "burn":
+        source.output(output_path, vf=subtitles_filter(subtitle_file), acodec='copy',
+                      **encode_params(load_media_index(video_path))).run(overwrite_output=True)
+    else:
+        ffmpeg.output(source, ffmpeg.input(subtitle_file), output_path, c='copy', **{'c:s': 'mov_text'}).run(overwrite_output=True)
+    return output_path
+
+# The subtitles filter for an SRT file. Its filename is unescaped twice (filtergraph, then filter options),
+# so Windows backslashes would be eaten: the path is given with forward slashes, relative to the working
+# directory where possible, and quoted with any drive colon escaped ('C\:/...').
+def subtitles_filter(subtitle_file):
+    try:
+        path = os.path.relpath(subtitle_file)
+    except ValueError:  # on another drive than the working directory
+        path = os.path.abspath(subtitle_file)
+    path = path.replace("\\", "/").replace(":", "\\:")
+    return f"subtitles='{path}'"
+
+# Place each segment's caption at the offset its cut file starts at within the concatenated output
+def retime_captions(reel_pieces):
+    captions = []
+    offset = 0.0
+    for segment, segment_file in reel_pieces:
+        duration = audio_duration(segment_file)
+        captions.append({'start': offset, 'end': offset + duration, 'text': segment['text']})
+        offset += duration
+    return captions
+
+# Step 7: Add Subtitles to Video
+def write_srt(subtitle_segments, subtitle_file):
+    with open(subtitle_file, "w") as f:
+        for idx, segment in enumerate(subtitle_segments):
+            start_time = segment['start']
+            end_time = segment['end']
+            text = segment['text']
+            f.write(f"{idx+1}\n")
+            f.write(f"{format_time(start_time)} --> {format_time(end_time)}\n")
+            f.write(f"{text}\n\n")
+
+# Convert seconds to HH:MM:SS,MS format for SRT file
+def format_time(seconds):
+    mins, sec = divmod(seconds, 60)
+    hour, mins = divmod(mins, 60)
+    return f"{int(hour):02}:{int(mins):02}:{int(sec):02},{int((sec % 1) * 1000):03}"
+
+# Full Process: Extract audio, transcribe, identify important segments, and add subtitles.
+# Everything is written inside the job's workspace, so several jobs can run on one host at once.
+# Each stage's output is checkpointed there too: re-running a failed job in the same workspace resumes
+# after the last completed stage. Without a workspace each call gets a fresh one, so concurrent runs of
+# one input never share files; the job queue passes the job's own workspace to resume.
+# progress_callback(stage, fraction) is called as each stage starts. asr_backend picks the
+# transcription backend for this job (see model_registry.ASR_BACKENDS).
+def process_video_to_reels(video_path, workspace=None, progress_callback=None, asr_backend=None):
+    workspace = workspace or JobWorkspace()
+    run = _process_video_pipelined if PIPELINED_EXECUTION else _process_video_in_workspace
+    try:
+        # Stage timings, CPU, memory and I/O go to the workspace's metrics.jsonl and the host-wide metrics log
+        with JobMetrics(workspace), measure_stage("job"):
+            result = run(video_path, workspace, progress_callback or (lambda stage, progress: None),
+                         asr_backend or ASR_BACKEND)
+    except Exception:
+        workspace.cleanup(succeeded=False)
+        raise
+    workspace.cleanup(succeeded=True)
+    return result
+
+# Options a transcript depends on, for its cache key and checkpoint; the VAD pre-pass changes the output slightly
+def _transcription_options():
+    if VAD_ENABLED and TRANSCRIBE_WORKERS <= 1:
+        return dict(TRANSCRIBE_OPTIONS, vad=True)
+    return TRANSCRIBE_OPTIONS
+
+# Settings each checkpointed stage depends on; a checkpoint saved under different settings is recomputed
+def _stage_fingerprints(pipelined, asr_backend):
+    return {
+        'transcription': [asr_model_id(asr_backend, WHISPER_MODEL_NAME), _transcription_options()],
+        # Pipelined runs checkpoint their eager cuts with the scores
+        'importance': (["pipelined", PIPELINE_CHUNK_TOKEN_BUDGET, SENTIMENT_BACKEND, SEGMENT_CUT_MODE] if pipelined
+                       else ["map_reduce"]),
+        'selection': [MIN_SEGMENT_GAP, MAX_SEGMENTS_PER_REEL * MIN_REELS, SENTIMENT_BACKEND],
+        'cut': [SEGMENT_CUT_MODE],
+    }
+
+# Transcripts of downloaded videos are cached under the audio track fetched with them, which
+# process_youtube_video_to_reels transcribes while the video itself is still downloading
+def _transcription_cache_key(video_path, asr_backend):
+    source = downloaded_audio_for(video_path) or video_path
+    return transcription_cache.make_key(source, asr_model_id(asr_backend, WHISPER_MODEL_NAME), _transcription_options())
+
+# Whole-file transcription of decoded audio (or a WAV path), through the VAD pre-pass when enabled
+def _transcribe_audio(audio, workspace, asr_backend):
+    speech, timeline = compact_audio_to_speech(audio, workspace) if VAD_ENABLED else (audio, None)
+    streaming = audio_duration(speech) >= STREAMING_MIN_DURATION
+    result = transcribe_audio_with_segment_timestamps(speech, streaming=streaming, asr_backend=asr_backend,
+                                                      timeline=timeline)
+    _remove_temp_audio(speech if timeline and isinstance(speech, str) else None)
+    return result
+
+# Remove temp audio files once transcription no longer needs them
+def _remove_temp_audio(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+# Decoded audio for transcription, reusing a WAV a failed run already extracted into the workspace
+def _load_audio_with_checkpoint(video_path, workspace, checkpoints):
+    audio_path = checkpoints.load("audio")
+    if audio_path:
+        return audio_path, audio_path
+    audio, temp_audio_path = load_audio_for_transcription(video_path, workspace)
+    if temp_audio_path:
+        checkpoints.save("audio", temp_audio_path, files=[temp_audio_path])
+    return audio, temp_audio_path
+
+def _process_video_in_workspace(video_path, workspace, report_progress, asr_backend=ASR_BACKEND):
+    checkpoints = StageCheckpoints(workspace, video_path)
+    fingerprints = _stage_fingerprints(False, asr_backend)
+
+    report_progress("transcribing", 0.05)
+    transcription = checkpoints.load("transcription", fingerprints['transcription'])
+    # Skip extraction and transcription entirely when this exact input was already transcribed
+    cache_key = _transcription_cache_key(video_path, asr_backend)
+    cached = None if transcription else transcription_cache.get(cache_key)
+    if transcription:
+        transcription_segments, full_text = transcription
+    elif cached:
+        transcription_segments, full_text = cached
+        print(f"Transcription cache hit for {video_path}: {transcription_cache.stats()}")
+    elif TRANSCRIBE_WORKERS > 1:
+        # Shard workers decode their own slices straight from the source
+        transcription_segments, full_text = transcribe_audio_with_segment_timestamps(
+            video_path, workers=TRANSCRIBE_WORKERS, asr_backend=asr_backend)
+        transcription_cache.put(cache_key, transcription_segments, full_text)
+    else:
+        audio, temp_audio_path = _load_audio_with_checkpoint(video_path, workspace, checkpoints)
+        transcription_segments, full_text = _transcribe_audio(audio, workspace, asr_backend)
+        # The extracted audio is kept after a failure so the retry can skip extraction
+        _remove_temp_audio(temp_audio_path)
+        transcription_cache.put(cache_key, transcription_segments, full_text)
+    if not transcription:
+        checkpoints.save("transcription", [transcription_segments, full_text], fingerprints['transcription'])
+
+    report_progress("identifying genre", 0.5)
+    genre = checkpoints.load("genre") or checkpoints.save("genre", identify_genre(transcription_segments))
+
+    report_progress("scoring segments", 0.55)
+    highlights = checkpoints.load("importance", fingerprints['importance'])
+    if highlights is None:
+        with measure_stage("importance") as stage:
+            highlights = analyze_importance_map_reduce(transcription_segments, genre)
+            stage.items = len(transcription_segments)
+        checkpoints.save("importance", highlights, fingerprints['importance'])
+    important_segments = checkpoints.load("selection", fingerprints['selection'])
+    if important_segments is None:
+        important_segments = checkpoints.save(
+            "selection", identify_and_compile_important_segments(transcription_segments, genre, highlights=highlights),
+            fingerprints['selection'])
+
+    report_progress("cutting reels", 0.7)
+    cut_pieces = checkpoints.load("cut", fingerprints['cut'])
+    if cut_pieces is None:
+        cut_pieces = cut_highlight_segments(video_path, important_segments, workspace)
+        checkpoints.save("cut", cut_pieces, fingerprints['cut'], files=[segment_file for _, segment_file in cut_pieces])
+
+    # Captions are rendered onto the highlight outputs only, never onto the full-length source
+    output_video_path = workspace.output_path("highlight_video_with_subtitles.mp4")
+    reel_paths = assemble_highlight_reels(video_path, cut_pieces, workspace, highlight_video_path=output_video_path)
+
+    # Save transcription to file
+    transcription_file_path = workspace.output_path("transcription.txt")
+    with open(transcription_file_path, "w") as file:
+        file.write(full_text)
+
+    report_progress("done", 1.0)
+    return reel_paths, output_video_path, transcription_file_path
+
+# Pipelined variant: transcribed segments stream into scoring in small chunks, and highlights the model
+# picks are cut while later audio is still being transcribed. The duration-budgeted selection still runs
+# over every candidate at the end; selected segments that weren't cut early are cut then, and early cuts
+# that weren't selected are discarded. Per-stage timings are printed and saved to the workspace.
+def _process_video_pipelined(video_path, workspace, report_progress, asr_backend=ASR_BACKEND):
+    checkpoints = StageCheckpoints(workspace, video_path)
+    fingerprints = _stage_fingerprints(True, asr_backend)
+    output_dir = workspace.temp_path("segments")
+    os.makedirs(output_dir, exist_ok=True)
+
+    report_progress("transcribing and scoring", 0.05)
+    transcription = checkpoints.load("transcription", fingerprints['transcription'])
+    genre = checkpoints.load("genre") if transcription else None
+    cut_candidates = checkpoints.load("importance", fingerprints['importance']) if genre else None
+    if cut_candidates is None:
+        transcription, genre, cut_candidates = _run_scoring_pipeline(video_path, workspace, checkpoints, transcription,
+                                                                     output_dir, asr_backend)
+        checkpoints.save("transcription", transcription, fingerprints['transcription'])
+        checkpoints.save("genre", genre)
+        checkpoints.save("importance", cut_candidates, fingerprints['importance'])
+    transcription_segments, full_text = transcription
+
+    report_progress("selecting highlights", 0.75)
+    # Early cuts of the previous run may be gone; selected ones are simply cut again below
+    cut_files = {(candidate['start'], candidate['end']): segment_file
+                 for candidate, segment_file in cut_candidates if segment_file and os.path.exists(segment_file)}
+    important_segments = checkpoints.load("selection", fingerprints['selection'])
+    if important_segments is None:
+        with measure_stage("selection") as stage:
+            important_segments = select_highlights([candidate for candidate, _ in cut_candidates],
+                                                   MAX_HIGHLIGHT_DURATION, min_gap=MIN_SEGMENT_GAP,
+                                                   max_segments=MAX_SEGMENTS_PER_REEL * MIN_REELS)
+            stage.items = len(important_segments)
+        checkpoints.save("selection", important_segments, fingerprints['selection'])
+    print(f"Total important segments selected: {len(important_segments)}")
+
+    report_progress("cutting reels", 0.8)
+    cut_pieces = checkpoints.load("cut", fingerprints['cut'])
+    if cut_pieces is None:
+        selected = {(segment['start'], segment['end']) for segment in important_segments}
+        for key, segment_file in list(cut_files.items()):
+            if key not in selected:
+                os.remove(segment_file)
+                del cut_files[key]
+        uncut = [segment for segment in important_segments if (segment['start'], segment['end']) not in cut_files]
+        cut_files.update(((segment['start'], segment['end']), segment_file)
+                         for segment, segment_file in cut_highlight_segments(video_path, uncut, workspace))
+        cut_pieces = [(segment, cut_files[(segment['start'], segment['end'])]) for segment in important_segments
+                      if (segment['start'], segment['end']) in cut_files]
+        checkpoints.save("cut", cut_pieces, fingerprints['cut'], files=[segment_file for _, segment_file in cut_pieces])
+
+    output_video_path = workspace.output_path("highlight_video_with_subtitles.mp4")
+    reel_paths = assemble_highlight_reels(video_path, cut_pieces, workspace, highlight_video_path=output_video_path)
+
+    transcription_file_path = workspace.output_path("transcription.txt")
+    with open(transcription_file_path, "w") as file:
+        file.write(full_text)
+
+    report_progress("done", 1.0)
+    return reel_paths, output_video_path, transcription_file_path
+
+# Transcribe -> score -> eager cut as concurrent stages. When the transcript is already checkpointed or
+# cached it is scored with map-reduce instead and nothing is cut early. Returns the transcription, the genre and (candidate, cut file or None) pairs.
+def _run_scoring_pipeline(video_path, workspace, checkpoints, transcription, output_dir, asr_backend=ASR_BACKEND):
+    cache_key = _transcription_cache_key(video_path, asr_backend)
+    cached = transcription or transcription_cache.get(cache_key)
+    if cached:
+        # With the transcript already there, chunk-by-chunk scoring has nothing to overlap with: score it with
+        # a few parallel map-reduce calls instead, and leave all cutting until the selection is known
+        transcription_segments, full_text = cached
+        genre = identify_genre(transcription_segments)
+        with measure_stage("importance") as stage:
+            highlights = analyze_importance_map_reduce(transcription_segments, genre)
+            stage.items = len(transcription_segments)
+        candidates = score_candidate_segments(list(enumerate(transcription_segments)), highlights)
+        return [transcription_segments, full_text], genre, [(candidate, None) for _, candidate in candidates]
+
+    temp_audio_path = temp_speech_path = None
+    if TRANSCRIBE_WORKERS > 1:
+        segment_source = transcribe_sharded(video_path, WHISPER_MODEL_NAME, TRANSCRIBE_WORKERS, TRANSCRIBE_OPTIONS,
+                                            asr_backend=asr_backend)
+    else:
+        audio, temp_audio_path = _load_audio_with_checkpoint(video_path, workspace, checkpoints)
+        speech, timeline = compact_audio_to_speech(audio, workspace) if VAD_ENABLED else (audio, None)
+        segment_source = transcribe_audio_streaming(speech, asr_backend=asr_backend)
+        if timeline is not None:
+            segment_source = timeline.remap_segments(segment_source)
+        temp_speech_path = speech if timeline and isinstance(speech, str) else None
+
+    transcription_segments = []
+
+    def transcribed_segments():
+        for segment in segment_source:
+            segment = {'start': segment['start'], 'end': segment['end'], 'text': segment['text'].strip()}
+            transcription_segments.append(segment)
+            yield len(transcription_segments) - 1, segment
+
+    client = get_llm_client()
+    scoring = {'genre': None, 'chunk': [], 'tokens': 0}
+
+    def score_pending(emit):
+        chunk, scoring['chunk'], scoring['tokens'] = scoring['chunk'], [], 0
+        if not chunk:
+            return
+        if scoring['genre'] is None:
+            scoring['genre'] = identify_genre([segment for _, segment in chunk])
+        try:
+            lines = [(index, format_segment_line(index, segment['text'])) for index, segment in chunk]
+            highlights = client.run(score_chunk(lines, scoring['genre'], client))
+        except Exception as e:
+            print(f"Error scoring transcript chunk: {e}")
+            highlights = []
+        confirmed = {highlight['index'] for highlight in highlights}
+        for index, candidate in score_candidate_segments(chunk, highlights):
+            emit((candidate, index in confirmed))
+
+    def score_segment(item, emit):
+        index, segment = item
+        scoring['chunk'].append(item)
+        scoring['tokens'] += count_tokens(format_segment_line(index, segment['text']))
+        if scoring['tokens'] >= PIPELINE_CHUNK_TOKEN_BUDGET:
+            score_pending(emit)
+
+    if SEGMENT_CUT_MODE == "smart":
+        keyframes = probe_keyframes(video_path)
+        params = video_encode_params(video_path)
+
+    def cut_candidate(item, emit):
+        candidate, confirmed = item
+        segment_file = None
+        # Only highlights the model picked are cut eagerly; keyword-only candidates wait for selection
+        if not confirmed:
+            emit((candidate, segment_file))
+            return
+        if SEGMENT_CUT_MODE == "smart":
+            try:
+                segment_file = smart_cut_segment(video_path, candidate, segment_output_path(candidate, output_dir),
+                                                 keyframes, params)
+            except Exception as e:
+                print(f"Error creating segment file: {e}")
+        else:
+            segment_file = cut_single_segment(video_path, candidate, output_dir, mode=SEGMENT_CUT_MODE)
+        emit((candidate, segment_file))
+
+    cut_candidates, stage_stats = run_pipeline("transcribe", transcribed_segments(), [
+        Stage("score", score_segment, finish=score_pending),
+        Stage("cut", cut_candidate),
+    ])
+    # The extracted audio is kept after a failure so the retry can skip extraction
+    _remove_temp_audio(temp_audio_path, temp_speech_path)
+
+    full_text = " ".join(segment['text'] for segment in transcription_segments)
+    transcription_cache.put(cache_key, transcription_segments, full_text)
+    print(format_stage_report(stage_stats))
+    record_pipeline_stats(stage_stats)
+    with open(workspace.path("pipeline_stages.json"), "w") as f:
+        json.dump(stage_stats, f, indent=2)
+    return [transcription_segments, full_text], scoring['genre'], cut_candidates
+
+# Function to download video from YouTube
+def download_video_from_youtube(youtube_url, output_dir=DOWNLOAD_DIR):
+    try:
+        manager = get_download_manager() if output_dir == DOWNLOAD_DIR else DownloadManager(output_dir)
+        return manager.download(youtube_url)
+    except Exception as e:
+        print(f"Error downloading video: {e}")
+        return None
+
+# Transcribe the audio track of a download into the transcription cache, where processing the video finds it.
+# Processing transcribes the video itself when this fails, so errors are only logged.
+def prefetch_transcription(audio_path, asr_backend=ASR_BACKEND):
+    try:
+        cache_key = transcription_cache.make_key(audio_path, asr_model_id(asr_backend, WHISPER_MODEL_NAME),
+                                                 _transcription_options())
+        if transcription_cache.get(cache_key) is not None:
+            return
+        with measure_stage("transcription_prefetch"), JobWorkspace(cleanup_policy="all") as workspace:
+            audio, _ = load_audio_for_transcription(audio_path, workspace)
+            transcription_segments, full_text = _transcribe_audio(audio, workspace, asr_backend)
+        transcription_cache.put(cache_key, transcription_segments, full_text)
+    except Exception as e:
+        print(f"Error transcribing downloaded audio {audio_path}: {e}")
+
+# Download a video and turn it into reels. The audio track is downloaded first and transcribed on its own
+# thread while the video downloads; processing then starts from the cached transcript.
+def process_youtube_video_to_reels(youtube_url, workspace=None, progress_callback=None, asr_backend=None):
+    asr_backend = asr_backend or ASR_BACKEND
+    # Created here rather than by process_video_to_reels, so the download is recorded with the job's stages
+    workspace = workspace or JobWorkspace()
+    if progress_callback:
+        progress_callback("downloading", 0.0)
+    prefetch_threads = []
+
+    def on_audio(audio_path):
+        # In a copy of this context, so the prefetch reports to the job's metrics
+        thread = threading.Thread(target=contextvars.copy_context().run,
+                                  args=(prefetch_transcription, audio_path, asr_backend), daemon=True,
+                                  name="transcription-prefetch")
+        thread.start()
+        prefetch_threads.append(thread)
+
+    # The download stage times only the download, the prefetch records its own stage
+    try:
+        with JobMetrics(workspace):
+            with measure_stage("download"):
+                video_path = get_download_manager().download(youtube_url, on_audio=on_audio)
+            for thread in prefetch_threads:
+                thread.join()
+    except Exception:
+        workspace.cleanup(succeeded=False)
+        raise
+    return process_video_to_reels(video_path, workspace, progress_callback, asr_backend)
+
+def get_user_data(email):
+    conn = connect_db()
+    cur = conn.cursor()
+    query = "SELECT username, email, dob, role, gender, profile_picture FROM users_credentials WHERE email = %s"
+    cur.execute(query, (email,))
+    user_data = cur.fetchone()
+    conn.close()
+    return user_data
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import re
+
+from llm_client import get_llm_client
+
+SCORING_MODEL = "gpt-3.5-turbo"
+# Prompt tokens spent on segment lines per request
+BATCH_TOKEN_BUDGET = 2000
+MAX_CONCURRENT_BATCHES = 4
+# Completion tokens reserved per segment for its [index, score] pair: about 8 in cl100k, up to about 15
+# when the model pretty-prints the array. A batch that runs out is cut off and its tail falls back.
+RESPONSE_TOKENS_PER_SEGMENT = 20
+
+SYSTEM_PROMPT = "You are a helpful assistant selecting meaningful moments for a video highlight reel."
+BATCH_INSTRUCTIONS = (
+    "For each numbered transcript segment below, rate how memorable or significant it is for a highlight reel. "
+    "Consider expressions of joy, excitement, or important information. "
+    "Respond only with a compact JSON array containing one [<segment number>, <score from 0 to 1>] pair per "
+    "segment, like [[0, 0.2], [1, 0.85]]."
+)
+
+_ARRAY_START_RE = re.compile(r"\[\s*[\[{\]]")
+_SEPARATOR_RE = re.compile(r"[\s,]*")
+
+_encoding = None
+
+
+# Count tokens the way the scoring model does
+def count_tokens(text, model=SCORING_MODEL):
+    global _encoding
+    if _encoding is None:
+        import tiktoken
+
+        try:
+            _encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text))
+
+
+def format_segment_line(index, text):
+    return f"[{index}] {text}"
+
+
+# Pack segments, tagged with their indices, into batches whose lines fit under the token budget
+def pack_segment_batches(segments, token_budget=BATCH_TOKEN_BUDGET):
+    batches = []
+    current = []
+    current_tokens = 0
+    for index, segment in enumerate(segments):
+        line = format_segment_line(index, segment['text'])
+        tokens = count_tokens(line) + 1
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append((index, line))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+# Items of the first JSON array of objects or arrays in a response, ignoring any prose around it. Items are
+# decoded one at a time, so a response cut off at max_tokens still yields every item before the cut.
+# Returns (items, complete); complete is False when the array was never closed.
+def parse_json_array_items(content):
+    match = _ARRAY_START_RE.search(content)
+    if not match:
+        return [], False
+    decoder = json.JSONDecoder()
+    items = []
+    position = match.start() + 1
+    while True:
+        position = _SEPARATOR_RE.match(content, position).end()
+        if position >= len(content):
+            return items, False
+        if content[position] == "]":
+            return items, True
+        try:
+            item, position = decoder.raw_decode(content, position)
+        except ValueError:
+            return items, False
+        items.append(item)
+
+
+# Parse per-segment scores out of a batch response: [index, score] pairs, or {"index", "score"} objects
+# from a model that ignored the requested format
+def parse_batch_scores(content, expected_indices):
+    items, _ = parse_json_array_items(content)
+    scores = {}
+    for item in items:
+        try:
+            if isinstance(item, dict):
+                index, score = int(item['index']), float(item['score'])
+            elif isinstance(item, list):
+                index, score = int(item[0]), float(item[1])
+            else:
+                continue
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        if index in expected_indices:
+            scores[index] = min(max(score, 0.0), 1.0)
+    return scores
+
+
+async def score_batch(batch, client, model=SCORING_MODEL):
+    lines = "\n".join(line for _, line in batch)
+    content = await client.acomplete(
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"{BATCH_INSTRUCTIONS}\n\n{lines}"}
+        ],
+        model=model,
+        temperature=0,
+        max_tokens=RESPONSE_TOKENS_PER_SEGMENT * len(batch) + 20
+    )
+    return parse_batch_scores(content, {index for index, _ in batch})
+
+
+async def _score_batches(batches, client, max_concurrency, model):
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(batch):
+        async with semaphore:
+            try:
+                return await score_batch(batch, client, model)
+            except Exception as e:
+                print(f"Error during batched OpenAI API call: {e}")
+                return {}
+
+    return await asyncio.gather(*(run(batch) for batch in batches))
+
+
+# Score every segment in batched requests, running at most max_concurrency batches at once.
+# Segments a batch fails to score are handed to fallback(segment), e.g. the per-segment prompt.
+def score_segments_batched(segments, fallback=None, token_budget=BATCH_TOKEN_BUDGET,
+                           max_concurrency=MAX_CONCURRENT_BATCHES, model=SCORING_MODEL, client=None):
+    client = client or get_llm_client()
+    scores = [None] * len(segments)
+    batches = pack_segment_batches(segments, token_budget)
+
+    for batch_scores in client.run(_score_batches(batches, client, max_concurrency, model)):
+        for index, score in batch_scores.items():
+            scores[index] = score
+
+    missing = [index for index, score in enumerate(scores) if score is None]
+    if missing:
+        print(f"Batched scoring missed {len(missing)} of {len(segments)} segments")
+    if fallback:
+        for index in missing:
+            scores[index] = fallback(segments[index])
+    return scores
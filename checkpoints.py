@@ -0,0 +1,77 @@
+import json
+import os
+import time
+
+from content_hash import hash_file
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+CHECKPOINT_DIR = "checkpoints"
+# Pipeline stages in order; re-saving a stage invalidates every stage after it
+STAGES = ("audio", "transcription", "genre", "importance", "selection", "cut")
+
+
+def _write_json(path, value):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Stage outputs of one job, kept in the job workspace so a failed run resumes after the last completed
+# stage. The manifest records the input video's content hash; a different input discards every
+# checkpoint. Each stage also stores a fingerprint of the settings it depends on and the files it
+# produced, and is only reused while both still match.
+class StageCheckpoints:
+    def __init__(self, workspace, video_path):
+        self.manifest_path = workspace.path(MANIFEST_NAME)
+        self.checkpoint_dir = workspace.path(CHECKPOINT_DIR)
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self.input_hash = hash_file(video_path)
+
+        manifest = _read_json(self.manifest_path)
+        if manifest is not None and (manifest.get('version') != MANIFEST_VERSION
+                                     or manifest.get('input_hash') != self.input_hash):
+            print(f"Input changed since the last run of {workspace.job_id}, discarding checkpoints")
+            manifest = None
+        self.manifest = manifest or {'version': MANIFEST_VERSION, 'input_hash': self.input_hash, 'stages': {}}
+
+    def _value_path(self, stage):
+        return os.path.join(self.checkpoint_dir, f"{stage}.json")
+
+    # Output of a completed stage, or None when it has to be (re)computed
+    def load(self, stage, fingerprint=None):
+        entry = self.manifest['stages'].get(stage)
+        if entry is None or entry['fingerprint'] != json.loads(json.dumps(fingerprint)):
+            return None
+        if not all(os.path.exists(path) for path in entry['files']):
+            return None
+        record = _read_json(self._value_path(stage))
+        if record is None:
+            return None
+        print(f"Resuming from checkpoint: {stage}")
+        return record['value']
+
+    def save(self, stage, value, fingerprint=None, files=()):
+        _write_json(self._value_path(stage), {'value': value})
+        # Later stages were computed from this stage's previous output
+        for later in STAGES[STAGES.index(stage) + 1:]:
+            self.manifest['stages'].pop(later, None)
+        self.manifest['stages'][stage] = {
+            'fingerprint': fingerprint,
+            'files': list(files),
+            'completed_at': time.time(),
+        }
+        _write_json(self.manifest_path, self.manifest)
+        return value
+
+    def completed_stages(self):
+        return [stage for stage in STAGES if stage in self.manifest['stages']]
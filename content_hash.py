@@ -0,0 +1,68 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Remember hashes of files that have not changed since they were last hashed
+_hash_memo = {}
+_hash_memo_lock = threading.Lock()
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _remember_hash(path, content_hash):
+    key = _stat_key(path)
+    with _hash_memo_lock:
+        _hash_memo[key] = content_hash
+
+
+# Compute a SHA-256 content hash of a file, reading it in fixed-size chunks
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    key = _stat_key(path)
+    with _hash_memo_lock:
+        if key in _hash_memo:
+            return _hash_memo[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+
+    with _hash_memo_lock:
+        _hash_memo[key] = content_hash
+    return content_hash
+
+
+# Copy a binary stream into directory under its content hash, hashing while copying so the data is read
+# once, in chunk_size pieces. Content that is already stored is not kept twice. The hash is remembered,
+# so caches keyed on the stored file don't hash it again. Returns (path, content_hash, already_stored).
+def store_stream_by_hash(stream, directory, extension="", chunk_size=HASH_CHUNK_SIZE):
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    # Written next to its final name so the rename below never copies across filesystems
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".incoming-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                digest.update(chunk)
+                f.write(chunk)
+        content_hash = digest.hexdigest()
+        path = os.path.join(directory, content_hash + extension.lower())
+        already_stored = os.path.exists(path)
+        if already_stored:
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    _remember_hash(path, content_hash)
+    return path, content_hash, already_stored
@@ -0,0 +1,132 @@
+import argparse
+import bisect
+import math
+import random
+import time
+
+import numpy as np
+
+# Durations are discretized to this many seconds; each segment's duration is rounded up so the budget always holds
+DURATION_RESOLUTION = 0.5
+
+
+# Drop candidates that another candidate dominates: one lying inside it (so it fits anywhere it does,
+# with no more duration) and scoring at least as much. Candidates are sorted by start, longest first.
+def _prune_dominated(candidates):
+    ends = np.array([c['end'] for c in candidates])
+    # Without a containment some neighbour's end would not increase, so there is nothing to prune
+    if np.all(np.diff(ends) > 0):
+        return candidates
+    starts = [c['start'] for c in candidates]
+    kept = []
+    for i, candidate in enumerate(candidates):
+        inside = candidates[i + 1:bisect.bisect_right(starts, candidate['end'])]
+        if not any(other['end'] <= candidate['end'] and other['score'] >= candidate['score'] for other in inside):
+            kept.append(candidate)
+    return kept
+
+
+# Pick the set of candidates with the highest total score whose combined duration fits max_duration.
+# Candidates are dicts with 'start', 'end' and 'score'. Chosen segments are at least min_gap seconds
+# apart and there are at most max_segments of them. This is a weighted-interval-scheduling knapsack
+# solved by DP over (candidates sorted by end) x (duration budget) x (segment count), vectorized per candidate.
+def select_highlights(candidates, max_duration, min_gap=0.0, max_segments=None, resolution=DURATION_RESOLUTION):
+    budget = int(math.floor(max_duration / resolution + 1e-9))
+
+    def weight_of(candidate):
+        return math.ceil((candidate['end'] - candidate['start']) / resolution - 1e-9)
+
+    usable = [c for c in candidates if c['score'] > 0 and c['end'] > c['start'] and weight_of(c) <= budget]
+    if budget <= 0 or not usable or max_segments == 0:
+        return []
+    usable = _prune_dominated(sorted(usable, key=lambda c: (c['start'], -c['end'])))
+
+    usable.sort(key=lambda c: (c['end'], c['start']))
+    ends = np.array([c['end'] for c in usable])
+    weights = [weight_of(c) for c in usable]
+    # previous[i] = number of candidates (in end order) that finish at least min_gap before candidate i starts
+    previous = np.searchsorted(ends, [c['start'] - min_gap for c in usable], side='right')
+
+    previous = np.minimum(previous, np.arange(len(usable)))
+
+    count_limited = max_segments is not None
+    count_slots = (min(max_segments, len(usable), budget) + 1) if count_limited else 1
+    # A candidate never reaches back further than max_duration + min_gap, so only a window of
+    # DP rows is kept (as a ring buffer). The take/skip decisions are kept in full for backtracking,
+    # packed 8 to a byte: at thousands of candidates writing them unpacked dominates the run time.
+    window = int(np.max(np.arange(1, len(usable) + 1) - previous)) + 1
+    best = np.zeros((window, budget + 1, count_slots))
+    taken = np.zeros((len(usable) + 1, ((budget + 1) * count_slots + 7) // 8), dtype=np.uint8)
+    with_candidate = np.empty((budget + 1, count_slots))
+    decisions = np.empty((budget + 1, count_slots), dtype=bool)
+    if count_limited:
+        # Taking a candidate with no segments left is never possible
+        with_candidate[:, 0] = -np.inf
+
+    for i, candidate in enumerate(usable, start=1):
+        weight = weights[i - 1]
+        prior = best[previous[i - 1] % window]
+        last = best[(i - 1) % window]
+        # Budgets too small for the candidate can't take it
+        with_candidate[:weight] = -np.inf
+        if count_limited:
+            np.add(prior[:budget + 1 - weight, :-1], candidate['score'], out=with_candidate[weight:, 1:])
+        else:
+            np.add(prior[:budget + 1 - weight, :], candidate['score'], out=with_candidate[weight:, :])
+        np.greater(with_candidate, last, out=decisions)
+        taken[i] = np.packbits(decisions)
+        np.maximum(with_candidate, last, out=best[i % window])
+
+    selected = []
+    i, remaining, slot = len(usable), budget, count_slots - 1
+    while i > 0:
+        bit = remaining * count_slots + slot
+        if taken[i, bit // 8] >> (7 - bit % 8) & 1:
+            selected.append(usable[i - 1])
+            remaining -= weights[i - 1]
+            if count_limited:
+                slot -= 1
+            i = previous[i - 1]
+        else:
+            i -= 1
+    return sorted(selected, key=lambda c: c['start'])
+
+
+# Greedy first-fit in time order, the selection the pipeline used before
+def select_highlights_greedy(candidates, max_duration):
+    selected = []
+    total_duration = 0
+    for candidate in sorted(candidates, key=lambda c: c['start']):
+        duration = candidate['end'] - candidate['start']
+        if total_duration + duration <= max_duration:
+            selected.append(candidate)
+            total_duration += duration
+    return selected
+
+
+def run_benchmark(candidate_count, max_duration, max_segments, seed=0):
+    rng = random.Random(seed)
+    candidates = []
+    position = 0.0
+    for _ in range(candidate_count):
+        duration = rng.uniform(1.5, 12.0)
+        candidates.append({'start': position, 'end': position + duration, 'score': rng.uniform(0.0, 10.0)})
+        position += duration + rng.uniform(0.0, 2.0)
+
+    start_time = time.perf_counter()
+    selected = select_highlights(candidates, max_duration, min_gap=1.0, max_segments=max_segments)
+    dp_ms = (time.perf_counter() - start_time) * 1000
+    greedy = select_highlights_greedy(candidates, max_duration)
+
+    print(f"{candidate_count} candidates, {max_duration}s budget, at most {max_segments} segments")
+    print(f"DP:     {len(selected)} segments, score {sum(c['score'] for c in selected):.1f}, {dp_ms:.1f} ms")
+    print(f"Greedy: {len(greedy)} segments, score {sum(c['score'] for c in greedy):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark duration-budgeted highlight selection")
+    parser.add_argument("--candidates", type=int, default=3000)
+    parser.add_argument("--max-duration", type=float, default=100.0)
+    parser.add_argument("--max-segments", type=int, default=30)
+    args = parser.parse_args()
+    run_benchmark(args.candidates, args.max_duration, args.max_segments)
@@ -0,0 +1,105 @@
+import asyncio
+
+from batch_scoring import pack_segment_batches, parse_json_array_items
+from llm_client import get_llm_client
+
+IMPORTANCE_MODEL = "gpt-3.5-turbo"
+# Prompt tokens of transcript lines per chunk, well inside gpt-3.5-turbo's context window
+CHUNK_TOKEN_BUDGET = 2500
+MAX_PARALLEL_CHUNKS = 4
+# Highlights a chunk may pick, and completion tokens reserved for each: an object with a few keywords is
+# about 25 tokens in cl100k
+MAX_PICKS_PER_CHUNK = 25
+RESPONSE_TOKENS_PER_PICK = 40
+
+MAP_INSTRUCTIONS = (
+    "Below is part of the transcript of a {genre} video. Each line starts with its segment number in brackets. "
+    "Pick the segments that are important moments for a highlight reel, focusing on detailed, granular moments, "
+    "at most {max_picks} of them. "
+    "Respond only with a JSON array of objects like "
+    "{{\"index\": <segment number>, \"score\": <importance from 0 to 10>, \"keywords\": [<up to 5 key words from the segment>]}}."
+)
+
+
+# Parse the highlights a chunk response picked, keeping only segment numbers that were in the chunk.
+# Returns (highlights, complete); a response cut off at max_tokens keeps the highlights before the cut.
+def parse_chunk_highlights(content, expected_indices):
+    items, complete = parse_json_array_items(content)
+    highlights = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item['index'])
+            score = float(item.get('score', 0))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if index not in expected_indices:
+            continue
+        keywords = item.get('keywords') or []
+        highlights.append({
+            'index': index,
+            'score': score,
+            'keywords': [str(keyword).lower() for keyword in keywords if str(keyword).strip()],
+        })
+    return highlights, complete
+
+
+# Map step: score one chunk of the transcript. A response that ran out of tokens keeps what it picked,
+# and each half of the chunk is scored again so the picks after the cut aren't lost.
+async def score_chunk(chunk, genre, client, model=IMPORTANCE_MODEL):
+    lines = "\n".join(line for _, line in chunk)
+    max_picks = min(len(chunk), MAX_PICKS_PER_CHUNK)
+    content = await client.acomplete(
+        [{"role": "system", "content": f"You are selecting important moments for a {genre} video highlight reel."},
+         {"role": "user", "content": f"{MAP_INSTRUCTIONS.format(genre=genre, max_picks=max_picks)}\n\n{lines}"}],
+        model=model,
+        temperature=0,
+        max_tokens=RESPONSE_TOKENS_PER_PICK * max_picks + 20,
+    )
+    highlights, complete = parse_chunk_highlights(content, {index for index, _ in chunk})
+    if complete or len(chunk) < 2:
+        return highlights
+    print(f"Highlights of a {len(chunk)}-segment chunk were cut off, scoring its halves again")
+    middle = len(chunk) // 2
+    halves = await asyncio.gather(score_chunk(chunk[:middle], genre, client, model),
+                                  score_chunk(chunk[middle:], genre, client, model))
+    return highlights + halves[0] + halves[1]
+
+
+async def _map_chunks(chunks, genre, client, max_parallel, model):
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def run(chunk):
+        async with semaphore:
+            try:
+                return await score_chunk(chunk, genre, client, model)
+            except Exception as e:
+                print(f"Error scoring transcript chunk: {e}")
+                return []
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+
+# Reduce step: merge chunk highlights into one list ranked by score, then by position in the video
+def reduce_highlights(chunk_highlights):
+    merged = {}
+    for highlights in chunk_highlights:
+        for highlight in highlights:
+            existing = merged.get(highlight['index'])
+            if existing is None:
+                merged[highlight['index']] = dict(highlight, keywords=list(highlight['keywords']))
+                continue
+            existing['score'] = max(existing['score'], highlight['score'])
+            existing['keywords'].extend(k for k in highlight['keywords'] if k not in existing['keywords'])
+    return sorted(merged.values(), key=lambda highlight: (-highlight['score'], highlight['index']))
+
+
+# Importance analysis that scales to any transcript length: chunk by tokens, score chunks concurrently, merge
+def analyze_importance_map_reduce(transcription_segments, genre, token_budget=CHUNK_TOKEN_BUDGET,
+                                  max_parallel=MAX_PARALLEL_CHUNKS, model=IMPORTANCE_MODEL, client=None):
+    client = client or get_llm_client()
+    chunks = pack_segment_batches(transcription_segments, token_budget)
+    print(f"Scoring {len(transcription_segments)} segments in {len(chunks)} chunks ({max_parallel} in parallel)")
+    chunk_highlights = client.run(_map_chunks(chunks, genre, client, max_parallel, model))
+    return reduce_highlights(chunk_highlights)
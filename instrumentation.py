@@ -0,0 +1,348 @@
+import argparse
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from job_workspace import JOBS_ROOT
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-job stage records, stored in the job workspace
+METRICS_FILE = "metrics.jsonl"
+# Records of every job on this host, the source of the Prometheus endpoint
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "pipeline_metrics.jsonl")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# The JobMetrics that stages report to; threads that should report to it run in a copy of the context
+_active = contextvars.ContextVar("active_job_metrics", default=None)
+# Every stage being measured in this process, on any thread. The RSS high-water mark is process-wide and
+# each stage resets it, so before a reset its reading is credited to all of them.
+_running_records = set()
+_running_lock = threading.Lock()
+
+
+# Bytes this process read from and wrote to storage (Linux only; ffmpeg child processes are not included)
+def _read_io_counters():
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ", 1) for line in f.read().splitlines())
+        return int(fields['read_bytes']), int(fields['write_bytes'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+# Reset the kernel's resident-set high-water mark so the next reading covers only the current stage
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+
+def _child_cpu_seconds():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+# Mutable record a stage fills in while it runs; the stage sets items to what it processed and can
+# add stage-specific figures to details
+class StageRecord:
+    def __init__(self, stage):
+        self.stage = stage
+        self.items = None
+        self.details = {}
+        self.peak_rss_bytes = 0
+
+
+# Stage metrics of one job: appended as JSON lines to the job workspace and to the host-wide log.
+# Use as a context manager to make it the recorder that measure_stage and @instrumented report to.
+class JobMetrics:
+    def __init__(self, workspace, log_path=METRICS_LOG_PATH):
+        self.job_id = workspace.job_id
+        self.path = workspace.path(METRICS_FILE)
+        self.log_path = log_path
+        self._lock = threading.Lock()
+
+    def record(self, entry):
+        line = json.dumps(dict(entry, job_id=self.job_id)) + "\n"
+        with self._lock:
+            for path in (self.path, self.log_path):
+                if not path:
+                    continue
+                try:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write(line)
+                except OSError as e:
+                    print(f"Could not write metrics to {path}: {e}")
+
+    def __enter__(self):
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active.reset(self._token)
+        return False
+
+
+# Credit the high-water mark reached since the last reset to every running stage; call with _running_lock held
+def _credit_peak_rss():
+    peak = _peak_rss_bytes() or 0
+    for record in _running_records:
+        record.peak_rss_bytes = max(record.peak_rss_bytes, peak)
+
+
+# Measure wall time, CPU time (this process and ffmpeg children), peak RSS and storage I/O of a block.
+# CPU, RSS and I/O are process-wide, so stages that run concurrently share their readings.
+@contextlib.contextmanager
+def measure_stage(stage, metrics=None):
+    record = StageRecord(stage)
+    started_at = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    child_cpu_start = _child_cpu_seconds()
+    io_start = _read_io_counters()
+    with _running_lock:
+        _credit_peak_rss()
+        peak_reset = _reset_peak_rss()
+        _running_records.add(record)
+    status = 'ok'
+    try:
+        yield record
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        io_end = _read_io_counters()
+        with _running_lock:
+            _credit_peak_rss()
+            _running_records.remove(record)
+        entry = {
+            'stage': stage,
+            'started_at': started_at,
+            'wall_seconds': round(time.perf_counter() - wall_start, 4),
+            'cpu_seconds': round(time.process_time() - cpu_start, 4),
+            'child_cpu_seconds': round(_child_cpu_seconds() - child_cpu_start, 4),
+            # Without a reset this is the process's lifetime peak
+            'peak_rss_bytes': record.peak_rss_bytes or None,
+            'peak_rss_is_stage_peak': peak_reset,
+            'read_bytes': io_end[0] - io_start[0] if io_start and io_end else None,
+            'write_bytes': io_end[1] - io_start[1] if io_start and io_end else None,
+            'items': record.items,
+            'status': status,
+        }
+        entry.update(record.details)
+        recorder = metrics or _active.get()
+        if recorder is not None:
+            recorder.record(entry)
+
+
+# Decorator form of measure_stage; items(result) gives the number of items the call processed
+def instrumented(stage, items=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure_stage(stage) as record:
+                result = function(*args, **kwargs)
+                if items is not None:
+                    try:
+                        record.items = items(result)
+                    except (TypeError, ValueError):
+                        pass
+                return result
+        return wrapper
+    return decorator
+
+
+# Record the per-stage stats of a pipeline.run_pipeline call; its stages overlap, so each is recorded
+# with its own busy and thread CPU time instead of being measured from outside
+def record_pipeline_stats(stage_stats, metrics=None):
+    recorder = metrics or _active.get()
+    if recorder is None:
+        return
+    for entry in stage_stats:
+        recorder.record({
+            'stage': f"pipeline.{entry['stage']}",
+            'started_at': time.time(),
+            'wall_seconds': entry['busy_seconds'],
+            'cpu_seconds': entry['cpu_seconds'],
+            'items': entry['items_in'],
+            'status': 'ok',
+        })
+
+
+def read_metrics(path):
+    entries = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def load_job_metrics(job_id, root=JOBS_ROOT):
+    return read_metrics(os.path.join(root, job_id, METRICS_FILE))
+
+
+# Per-stage totals of one job's records, in the order the stages first ran
+def summarize_job_metrics(entries):
+    summary = {}
+    for entry in entries:
+        stage = summary.setdefault(entry['stage'], {
+            'stage': entry['stage'], 'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'child_cpu_seconds': 0.0,
+            'peak_rss_mb': 0.0, 'read_mb': 0.0, 'write_mb': 0.0, 'items': 0})
+        stage['runs'] += 1
+        stage['wall_seconds'] += entry.get('wall_seconds') or 0.0
+        stage['cpu_seconds'] += entry.get('cpu_seconds') or 0.0
+        stage['child_cpu_seconds'] += entry.get('child_cpu_seconds') or 0.0
+        stage['peak_rss_mb'] = max(stage['peak_rss_mb'], (entry.get('peak_rss_bytes') or 0) / 2 ** 20)
+        stage['read_mb'] += (entry.get('read_bytes') or 0) / 2 ** 20
+        stage['write_mb'] += (entry.get('write_bytes') or 0) / 2 ** 20
+        stage['items'] += entry.get('items') or 0
+    return [{name: round(value, 3) if isinstance(value, float) else value for name, value in stage.items()}
+            for stage in summary.values()]
+
+
+_PROMETHEUS_METRICS = [
+    ('reel_stage_runs_total', 'counter', 'Stage executions', lambda entry: 1),
+    ('reel_stage_errors_total', 'counter', 'Stage executions that raised', lambda entry: entry.get('status') == 'error'),
+    ('reel_stage_wall_seconds_total', 'counter', 'Wall-clock time spent in the stage', lambda entry: entry.get('wall_seconds')),
+    ('reel_stage_cpu_seconds_total', 'counter', 'CPU time of the worker process during the stage', lambda entry: entry.get('cpu_seconds')),
+    ('reel_stage_child_cpu_seconds_total', 'counter', 'CPU time of child processes (ffmpeg) during the stage', lambda entry: entry.get('child_cpu_seconds')),
+    ('reel_stage_read_bytes_total', 'counter', 'Bytes read from storage during the stage', lambda entry: entry.get('read_bytes')),
+    ('reel_stage_write_bytes_total', 'counter', 'Bytes written to storage during the stage', lambda entry: entry.get('write_bytes')),
+    ('reel_stage_items_total', 'counter', 'Items processed by the stage', lambda entry: entry.get('items')),
+]
+
+
+# Running per-stage totals of a metrics log, updated from the lines appended since the last read.
+# A log that shrank or was replaced (rotated) is read again from the start.
+class _LogTotals:
+    def __init__(self):
+        self.identity = None
+        self.offset = 0
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def _add(self, entry):
+        values = [float(value_of(entry) or 0) for _, _, _, value_of in _PROMETHEUS_METRICS]
+        peak = int(entry.get('peak_rss_bytes') or 0)
+        stage = self.stages.setdefault(entry['stage'], {'totals': [0.0] * len(values), 'peak': 0})
+        stage['totals'] = [total + value for total, value in zip(stage['totals'], values)]
+        stage['peak'] = max(stage['peak'], peak)
+
+    def update(self, log_path):
+        with self._lock:
+            try:
+                f = open(log_path, "rb")
+            except OSError:
+                self.identity, self.offset, self.stages = None, 0, {}
+                return {}
+            with f:
+                stat = os.fstat(f.fileno())
+                identity = (stat.st_dev, stat.st_ino)
+                if identity != self.identity or stat.st_size < self.offset:
+                    self.identity, self.offset, self.stages = identity, 0, {}
+                f.seek(self.offset)
+                data = f.read()
+            # A line still being written is left for the next read
+            data = data[:data.rfind(b"\n") + 1]
+            self.offset += len(data)
+            for line in data.splitlines():
+                try:
+                    entry = json.loads(line)
+                    self._add(entry)
+                except (ValueError, KeyError, TypeError):
+                    continue
+            return {name: dict(stage) for name, stage in self.stages.items()}
+
+
+_log_totals = {}
+_log_totals_lock = threading.Lock()
+
+
+# Prometheus text exposition of the host-wide log: totals per stage plus the largest peak RSS seen. Totals
+# are kept between scrapes, so each scrape only reads the entries appended since the previous one.
+def render_prometheus(log_path=METRICS_LOG_PATH):
+    with _log_totals_lock:
+        log_totals = _log_totals.setdefault(os.path.abspath(log_path), _LogTotals())
+    totals = log_totals.update(log_path)
+    stages = sorted(totals)
+    lines = []
+    for position, (name, kind, help_text, _) in enumerate(_PROMETHEUS_METRICS):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f'{name}{{stage="{stage}"}} {totals[stage]["totals"][position]:g}' for stage in stages)
+
+    lines.append("# HELP reel_stage_peak_rss_bytes Largest resident set size observed during the stage")
+    lines.append("# TYPE reel_stage_peak_rss_bytes gauge")
+    lines.extend(f'reel_stage_peak_rss_bytes{{stage="{stage}"}} {totals[stage]["peak"]}' for stage in stages)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    log_path = METRICS_LOG_PATH
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        payload = render_prometheus(self.log_path).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve /metrics on a background thread; returns the server
+def start_metrics_server(host="0.0.0.0", port=METRICS_PORT, log_path=METRICS_LOG_PATH):
+    handler = type("ConfiguredMetricsHandler", (MetricsHandler,), {"log_path": log_path})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve pipeline stage metrics in the Prometheus text format")
+    parser.add_argument("--port", type=int, default=METRICS_PORT)
+    parser.add_argument("--log", default=METRICS_LOG_PATH)
+    args = parser.parse_args()
+    server = start_metrics_server(port=args.port, log_path=args.log)
+    print(f"Serving metrics at http://0.0.0.0:{args.port}/metrics")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,281 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from video_downloads import is_url
+
+QUEUE_DB_PATH = "jobs.sqlite3"
+POLL_INTERVAL_SECONDS = 1.0
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Running jobs are touched this often by their worker; one untouched for STALE_JOB_SECONDS is presumed
+# abandoned (this is how workers on other hosts, or on Windows, are judged)
+HEARTBEAT_SECONDS = 30.0
+STALE_JOB_SECONDS = 300.0
+# Idle workers prune stale job workspaces at most this often
+PRUNE_INTERVAL_SECONDS = 60 * 60
+
+
+def _connect(db_path=QUEUE_DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_queue(db_path=QUEUE_DB_PATH):
+    conn = _connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            video_path TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT,
+            progress REAL NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            worker TEXT,
+            asr_backend TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+    # Queues created before per-job ASR backends
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if 'asr_backend' not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN asr_backend TEXT")
+    conn.close()
+
+
+# Add a job to the queue; the job ID is also the ID of its workspace. video_path may also be a video URL,
+# which the worker downloads. A video whose last job failed re-runs that job, so it resumes from the
+# checkpoints left in its workspace. asr_backend selects the transcription backend for this job; None
+# uses the worker's default.
+def enqueue_job(video_path, db_path=QUEUE_DB_PATH, asr_backend=None):
+    init_queue(db_path)
+    if not is_url(video_path):
+        video_path = os.path.abspath(video_path)
+    conn = _connect(db_path)
+    failed = conn.execute("SELECT id FROM jobs WHERE video_path = ? AND status = 'failed' ORDER BY updated_at DESC LIMIT 1",
+                          (video_path,)).fetchone()
+    conn.close()
+    if failed is not None:
+        retry_job(failed['id'], db_path)
+        update_job(failed['id'], db_path, asr_backend=asr_backend)
+        return failed['id']
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn = _connect(db_path)
+    conn.execute(
+        "INSERT INTO jobs (id, video_path, status, stage, asr_backend, created_at, updated_at) "
+        "VALUES (?, ?, 'queued', 'queued', ?, ?, ?)",
+        (job_id, video_path, asr_backend, now, now))
+    conn.close()
+    return job_id
+
+
+# Queue a failed job again under the same ID and workspace
+def retry_job(job_id, db_path=QUEUE_DB_PATH):
+    conn = _connect(db_path)
+    count = conn.execute(
+        "UPDATE jobs SET status = 'queued', stage = 'queued', progress = 0, error = NULL, worker = NULL, updated_at = ? "
+        "WHERE id = ? AND status = 'failed'", (time.time(), job_id)).rowcount
+    conn.close()
+    return count > 0
+
+
+def get_job(job_id, db_path=QUEUE_DB_PATH):
+    conn = _connect(db_path)
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    job = dict(row)
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def update_job(job_id, db_path=QUEUE_DB_PATH, **fields):
+    fields['updated_at'] = time.time()
+    if 'result' in fields:
+        fields['result'] = json.dumps(fields['result'])
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = _connect(db_path)
+    conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    conn.close()
+
+
+# Atomically move the oldest queued job to running and return it
+def claim_next_job(worker_name, db_path=QUEUE_DB_PATH):
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute("UPDATE jobs SET status = 'running', stage = 'starting', worker = ?, updated_at = ? WHERE id = ?",
+                     (worker_name, time.time(), row['id']))
+        conn.execute("COMMIT")
+        return dict(row)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+# Whether the worker ("host:pid") that claimed a running job is still at it. A worker on this host is
+# checked by pid; any worker whose heartbeat stopped counts as gone.
+def _worker_alive(worker, updated_at, now):
+    if now - updated_at > STALE_JOB_SECONDS:
+        return False
+    host, _, pid = (worker or "").rpartition(":")
+    # os.kill(pid, 0) would terminate the process on Windows
+    if host == socket.gethostname() and pid.isdigit() and os.name == "posix":
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+    return True
+
+
+# Put jobs that were running when their worker died back in the queue. Jobs of live workers, e.g. of
+# another pool on the same queue, are left alone.
+def requeue_interrupted_jobs(db_path=QUEUE_DB_PATH):
+    init_queue(db_path)
+    conn = _connect(db_path)
+    count = 0
+    now = time.time()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for row in conn.execute("SELECT id, worker, updated_at FROM jobs WHERE status = 'running'").fetchall():
+            if not _worker_alive(row['worker'], row['updated_at'], now):
+                count += conn.execute("UPDATE jobs SET status = 'queued', stage = 'queued', worker = NULL WHERE id = ?",
+                                      (row['id'],)).rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return count
+
+
+# Remove stale job workspaces, keeping those of queued and running jobs so they can still resume
+def prune_job_workspaces(db_path=QUEUE_DB_PATH):
+    from job_workspace import prune_workspaces
+
+    init_queue(db_path)
+    conn = _connect(db_path)
+    try:
+        active = {row['id'] for row in conn.execute("SELECT id FROM jobs WHERE status IN ('queued', 'running')")}
+    finally:
+        conn.close()
+    removed = prune_workspaces(keep=active)
+    if removed:
+        print(f"Pruned {len(removed)} stale job workspaces")
+    return removed
+
+
+def run_job(job, db_path=QUEUE_DB_PATH):
+    from backend import process_video_to_reels, process_youtube_video_to_reels
+    from job_workspace import JobWorkspace
+
+    def report(stage, progress):
+        update_job(job['id'], db_path, stage=stage, progress=progress)
+
+    # Keep the job's updated_at fresh through long stages so other pools don't take it for abandoned
+    finished = threading.Event()
+
+    def heartbeat():
+        while not finished.wait(HEARTBEAT_SECONDS):
+            update_job(job['id'], db_path)
+
+    threading.Thread(target=heartbeat, daemon=True, name=f"heartbeat-{job['id']}").start()
+    try:
+        process = process_youtube_video_to_reels if is_url(job['video_path']) else process_video_to_reels
+        reel_paths, highlight_video_path, transcription_file_path = process(
+            job['video_path'], workspace=JobWorkspace(job['id']), progress_callback=report,
+            asr_backend=job.get('asr_backend'))
+        update_job(job['id'], db_path, status='done', stage='done', progress=1.0, result={
+            'reel_paths': reel_paths,
+            'highlight_video_path': highlight_video_path,
+            'transcription_file_path': transcription_file_path,
+        })
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job['id'], db_path, status='failed', stage='failed', error=str(e))
+    finally:
+        finished.set()
+
+
+# Worker process: loads Whisper once (unless a shared model server is running), then processes jobs until stopped
+def worker_loop(db_path=QUEUE_DB_PATH, poll_interval=POLL_INTERVAL_SECONDS, asr_threads=0):
+    import backend  # noqa: F401
+    from model_registry import preload_whisper_model, set_asr_threads
+
+    set_asr_threads(asr_threads)
+    preload_whisper_model()
+
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Job worker {worker_name} ready")
+    last_prune = time.monotonic()
+    while True:
+        job = claim_next_job(worker_name, db_path)
+        if job is None:
+            if time.monotonic() - last_prune >= PRUNE_INTERVAL_SECONDS:
+                last_prune = time.monotonic()
+                try:
+                    prune_job_workspaces(db_path)
+                except Exception as e:
+                    print(f"Pruning job workspaces failed: {e}")
+            time.sleep(poll_interval)
+            continue
+        print(f"Worker {worker_name} processing job {job['id']}")
+        run_job(job, db_path)
+
+
+def start_worker_pool(workers=JOB_WORKERS, db_path=QUEUE_DB_PATH):
+    from model_registry import ASR_THREADS
+
+    requeue_interrupted_jobs(db_path)
+    prune_job_workspaces(db_path)
+    # Split the cores between workers so concurrent transcriptions don't oversubscribe the CPU
+    asr_threads = ASR_THREADS or max(1, (os.cpu_count() or 1) // max(1, workers))
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for _ in range(workers):
+        process = context.Process(target=worker_loop, args=(db_path, POLL_INTERVAL_SECONDS, asr_threads))
+        process.start()
+        processes.append(process)
+    return processes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run reel-generation job workers")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    parser.add_argument("--db", default=QUEUE_DB_PATH)
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus stage metrics on this port")
+    parser.add_argument("--retry", metavar="JOB_ID", help="requeue a failed job, resuming from its checkpoints, and exit")
+    args = parser.parse_args()
+    if args.retry:
+        print("Requeued" if retry_job(args.retry, args.db) else "No failed job with that ID")
+        raise SystemExit
+    if args.metrics_port:
+        from instrumentation import start_metrics_server
+        start_metrics_server(port=args.metrics_port)
+        print(f"Serving stage metrics at http://0.0.0.0:{args.metrics_port}/metrics")
+    pool = start_worker_pool(args.workers, args.db)
+    for process in pool:
+        process.join()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import time
+import uuid
+
+JOBS_ROOT = "jobs"
+# keep: leave everything; intermediates: remove the scratch directory once the job succeeds;
+# all: remove the whole workspace when the job ends
+CLEANUP_POLICIES = ("keep", "intermediates", "all")
+DEFAULT_CLEANUP_POLICY = "intermediates"
+# Workspaces untouched for this long are pruned by the job workers; 0 disables pruning
+WORKSPACE_RETENTION_HOURS = float(os.getenv("WORKSPACE_RETENTION_HOURS", "24"))
+
+
+# Per-job working directory: every file a pipeline run writes goes under jobs/<job_id>/,
+# with scratch files in tmp/ and deliverables in outputs/, so concurrent jobs never collide
+class JobWorkspace:
+    def __init__(self, job_id=None, root=JOBS_ROOT, cleanup_policy=DEFAULT_CLEANUP_POLICY):
+        if cleanup_policy not in CLEANUP_POLICIES:
+            raise ValueError(f"Unknown cleanup policy '{cleanup_policy}', expected one of {CLEANUP_POLICIES}")
+        self.job_id = job_id or uuid.uuid4().hex
+        self.cleanup_policy = cleanup_policy
+        self.root = os.path.join(root, self.job_id)
+        self.temp_dir = os.path.join(self.root, "tmp")
+        self.outputs_dir = os.path.join(self.root, "outputs")
+        os.makedirs(self.temp_dir, exist_ok=True)
+        os.makedirs(self.outputs_dir, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def temp_path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def output_path(self, name):
+        return os.path.join(self.outputs_dir, name)
+
+    def cleanup(self, succeeded=True):
+        if self.cleanup_policy == "all":
+            shutil.rmtree(self.root, ignore_errors=True)
+        elif self.cleanup_policy == "intermediates" and succeeded:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup(succeeded=exc_type is None)
+        return False
+
+
+# Remove job workspaces that haven't been touched for max_age_seconds, except those of the job IDs in keep
+def prune_workspaces(root=JOBS_ROOT, max_age_seconds=WORKSPACE_RETENTION_HOURS * 60 * 60, keep=()):
+    if max_age_seconds <= 0 or not os.path.isdir(root):
+        return []
+    cutoff = time.time() - max_age_seconds
+    removed = []
+    for job_id in os.listdir(root):
+        job_dir = os.path.join(root, job_id)
+        if job_id not in keep and os.path.isdir(job_dir) and os.path.getmtime(job_dir) < cutoff:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            removed.append(job_id)
+    return removed
@@ -0,0 +1,102 @@
+import argparse
+import random
+import re
+import time
+from collections import defaultdict
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+herself him himself his how i if in into is it its itself just me more most my myself no nor not now of off on
+once only or other our ours ourselves out over own same she should so some such than that the their theirs them
+themselves then there these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves it's i'm you're we're they're that's don't
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+# Inverted index over normalized segment tokens: token -> {segment index: [token positions]}
+class SegmentKeywordIndex:
+    def __init__(self, segments):
+        self.segment_count = len(segments)
+        self.postings = defaultdict(dict)
+        for segment_index, segment in enumerate(segments):
+            for position, token in enumerate(tokenize(segment['text'])):
+                self.postings[token].setdefault(segment_index, []).append(position)
+
+    # Segments in which the tokens appear consecutively
+    def match_phrase(self, tokens):
+        if not tokens or any(token not in self.postings for token in tokens):
+            return set()
+        candidates = set(self.postings[tokens[0]])
+        for token in tokens[1:]:
+            candidates &= set(self.postings[token])
+        matches = set()
+        for segment_index in candidates:
+            following = [set(self.postings[token][segment_index]) for token in tokens[1:]]
+            for start in self.postings[tokens[0]][segment_index]:
+                if all(start + offset + 1 in positions for offset, positions in enumerate(following)):
+                    matches.add(segment_index)
+                    break
+        return matches
+
+    # Score every segment against the keywords in one pass over the postings.
+    # Single words add one point per matching segment; with phrase_matching, multi-word
+    # keywords only count where the whole phrase occurs and add one point per word.
+    def score(self, keywords, phrase_matching=True):
+        scores = [0] * self.segment_count
+        terms = set()
+        phrases = set()
+        for keyword in keywords:
+            tokens = tuple(tokenize(keyword))
+            if len(tokens) > 1 and phrase_matching:
+                phrases.add(tokens)
+            else:
+                terms.update(token for token in tokens if token not in STOPWORDS)
+
+        for term in sorted(terms):
+            for segment_index in self.postings.get(term, ()):
+                scores[segment_index] += 1
+        for phrase in sorted(phrases):
+            for segment_index in self.match_phrase(phrase):
+                scores[segment_index] += len(phrase)
+        return scores
+
+
+# Micro-benchmark: nested substring scan (the old selection loop) against the inverted index
+def run_benchmark(segment_count, keyword_count, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(5000)] + sorted(STOPWORDS)
+    segments = [{'text': " ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 20)))}
+                for _ in range(segment_count)]
+    important_text = " ".join(rng.choice(vocabulary) for _ in range(keyword_count))
+
+    start_time = time.perf_counter()
+    scan_matches = 0
+    for segment in segments:
+        if [keyword for keyword in important_text.split() if keyword in segment['text'].lower()]:
+            scan_matches += 1
+    scan_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    scores = SegmentKeywordIndex(segments).score(important_text.split())
+    index_matches = sum(1 for score in scores if score > 0)
+    index_seconds = time.perf_counter() - start_time
+
+    print(f"{segment_count} segments, {keyword_count} keywords")
+    print(f"Nested scan:    {scan_seconds * 1000:.1f} ms ({scan_matches} segments matched)")
+    print(f"Inverted index: {index_seconds * 1000:.1f} ms ({index_matches} segments matched, stopwords ignored)")
+    print(f"Speedup: {scan_seconds / index_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark keyword matching for segment selection")
+    parser.add_argument("--segments", type=int, default=10000)
+    parser.add_argument("--keywords", type=int, default=500)
+    args = parser.parse_args()
+    run_benchmark(args.segments, args.keywords)
@@ -0,0 +1,127 @@
+import contextlib
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CACHE_PATH = "llm_cache.sqlite3"
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+MAX_ENTRIES = 10000
+# Responses at or below this temperature are treated as deterministic and cached by default
+DETERMINISTIC_MAX_TEMPERATURE = 0.0
+# The API's default when no temperature is sent
+DEFAULT_TEMPERATURE = 1.0
+# Job worker processes share the cache file; a writer waits this long for another's lock before erroring
+BUSY_TIMEOUT_SECONDS = 5.0
+# A hit refreshes last_access for LRU eviction only when it is older than this, so most hits don't write
+ACCESS_REFRESH_SECONDS = 60 * 60
+
+_QUOTE_TRANSLATION = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"'})
+
+
+# Normalize prompt text so trivially different prompts share a cache entry
+def normalize_prompt(text):
+    text = unicodedata.normalize("NFKC", text).translate(_QUOTE_TRANSLATION)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# Persistent prompt -> response cache backed by SQLite, with TTL and LRU size eviction
+class PromptCache:
+    def __init__(self, path=CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        # WAL lets the job workers read while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    def make_key(self, model, temperature, messages, params=None):
+        system = " ".join(normalize_prompt(m['content']) for m in messages if m['role'] == 'system')
+        prompt = [(m['role'], normalize_prompt(m['content'])) for m in messages if m['role'] != 'system']
+        payload = json.dumps({
+            'model': model,
+            'temperature': DEFAULT_TEMPERATURE if temperature is None else temperature,
+            'system': system,
+            'prompt': prompt,
+            'params': params or {},
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, temperature, allow_nondeterministic=False):
+        if temperature is None:
+            temperature = DEFAULT_TEMPERATURE
+        if temperature <= DETERMINISTIC_MAX_TEMPERATURE or allow_nondeterministic:
+            return True
+        with self._lock:
+            self.skipped += 1
+        return False
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._conn.execute(
+                "SELECT content, created_at, last_access FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            if now - row[2] > ACCESS_REFRESH_SECONDS:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, content):
+        now = time.time()
+        with self._lock, self._transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, now, now))
+            self._evict(now)
+
+    # Commit on success; roll back on error so a failed write doesn't leave the database locked
+    @contextlib.contextmanager
+    def _transaction(self):
+        try:
+            yield
+            if self._conn.in_transaction:
+                self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,))
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'skipped': self.skipped,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+            }
@@ -0,0 +1,264 @@
+import asyncio
+import collections
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from llm_cache import PromptCache
+from stub_llm_server import stub_reply
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+# Requests per minute allowed per model; models not listed use FALLBACK_REQUESTS_PER_MINUTE
+REQUESTS_PER_MINUTE = {"gpt-3.5-turbo": 3500}
+FALLBACK_REQUESTS_PER_MINUTE = 60
+REQUEST_TIMEOUT_SECONDS = 60.0
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+LATENCY_SAMPLES = 1000
+
+_openai_api_key_path = None
+
+
+# API key file for the openai module, applied when it is first imported
+def set_openai_api_key_path(path):
+    global _openai_api_key_path
+    _openai_api_key_path = path
+
+
+# openai and aiohttp are imported on first use so importing the app doesn't pay for them
+def _import_openai():
+    import openai
+
+    if _openai_api_key_path:
+        openai.api_key_path = _openai_api_key_path
+    return openai
+
+
+# Token bucket limiting how fast requests are started for one model
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+# Calls the OpenAI API, reusing one aiohttp session (and its connection pool) for every request
+class OpenAIBackend:
+    def __init__(self):
+        self._session = None
+        self._retryable_errors = None
+
+    # Errors worth retrying: rate limits, timeouts, server and connection errors
+    @property
+    def retryable_errors(self):
+        if self._retryable_errors is None:
+            import aiohttp
+
+            openai = _import_openai()
+            self._retryable_errors = (
+                openai.error.RateLimitError,
+                openai.error.Timeout,
+                openai.error.APIError,
+                openai.error.APIConnectionError,
+                openai.error.ServiceUnavailableError,
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+            )
+        return self._retryable_errors
+
+    async def complete(self, model, messages, **params):
+        import aiohttp
+
+        openai = _import_openai()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        openai.aiosession.set(self._session)
+        response = await openai.ChatCompletion.acreate(model=model, messages=messages, **params)
+        usage = response.get('usage', {})
+        return response.choices[0].message['content'], {
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0),
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+# Answers locally with the stub server's deterministic replies, for offline runs and benchmarks
+class StubBackend:
+    retryable_errors = (asyncio.TimeoutError,)
+
+    def __init__(self, reply=stub_reply, latency=0.0):
+        self.reply = reply
+        self.latency = latency
+
+    async def complete(self, model, messages, **params):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = self.reply(messages)
+        return content, {
+            'prompt_tokens': sum(len(message['content'].split()) for message in messages),
+            'completion_tokens': len(content.split()),
+        }
+
+    async def close(self):
+        pass
+
+
+# Shared LLM client: per-model rate limiting, per-call timeouts, jittered exponential retry,
+# latency/token metrics and an optional persistent response cache. Coroutines run on one
+# background event loop so the synchronous pipeline code can call complete() directly.
+class LLMClient:
+    def __init__(self, backend=None, requests_per_minute=None, timeout=REQUEST_TIMEOUT_SECONDS,
+                 max_retries=MAX_RETRIES, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY, cache=None):
+        self.backend = backend or OpenAIBackend()
+        self.cache = cache
+        self.requests_per_minute = dict(REQUESTS_PER_MINUTE, **(requests_per_minute or {}))
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets = {}
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _bucket(self, model):
+        if model not in self._buckets:
+            rate = self.requests_per_minute.get(model, FALLBACK_REQUESTS_PER_MINUTE) / 60.0
+            self._buckets[model] = TokenBucket(rate, capacity=max(1.0, rate))
+        return self._buckets[model]
+
+    def _model_metrics(self, model):
+        if model not in self._metrics:
+            self._metrics[model] = {
+                'calls': 0, 'failures': 0, 'retries': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0,
+                'latencies': collections.deque(maxlen=LATENCY_SAMPLES),
+            }
+        return self._metrics[model]
+
+    def _record(self, model, **updates):
+        with self._metrics_lock:
+            metrics = self._model_metrics(model)
+            latency = updates.pop('latency', None)
+            if latency is not None:
+                metrics['latencies'].append(latency)
+            for name, value in updates.items():
+                metrics[name] += value
+
+    # allow_nondeterministic caches responses even when temperature makes them vary between calls
+    async def acomplete(self, messages, model=DEFAULT_MODEL, use_cache=True, allow_nondeterministic=False, **params):
+        cache_key = None
+        if use_cache and self.cache is not None:
+            temperature = params.get('temperature')
+            if self.cache.is_cacheable(temperature, allow_nondeterministic):
+                cache_params = {name: value for name, value in params.items() if name != 'temperature'}
+                cache_key = self.cache.make_key(model, temperature, messages, cache_params)
+                try:
+                    cached = self.cache.get(cache_key)
+                except sqlite3.Error as e:
+                    # A locked or broken cache only costs a request
+                    print(f"LLM cache lookup failed: {e}")
+                    cached = None
+                if cached is not None:
+                    return cached
+
+        content = await self._acomplete_uncached(messages, model, **params)
+        if cache_key is not None:
+            try:
+                self.cache.put(cache_key, content)
+            except sqlite3.Error as e:
+                print(f"LLM cache store failed: {e}")
+        return content
+
+    async def _acomplete_uncached(self, messages, model, **params):
+        bucket = self._bucket(model)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            start_time = time.perf_counter()
+            try:
+                content, usage = await asyncio.wait_for(
+                    self.backend.complete(model, messages, **params), self.timeout)
+            except self.backend.retryable_errors as e:
+                if attempt == self.max_retries:
+                    self._record(model, failures=1)
+                    raise
+                # Full jitter keeps concurrent callers from retrying in lockstep
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                print(f"LLM call to {model} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                self._record(model, retries=1)
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self._record(model, failures=1)
+                raise
+            self._record(model, calls=1, latency=time.perf_counter() - start_time, **usage)
+            return content.strip()
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True, name="llm-client-loop").start()
+            return self._loop
+
+    # Run a coroutine on the client's event loop and wait for its result
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop()).result()
+
+    def complete(self, messages, model=DEFAULT_MODEL, **params):
+        return self.run(self.acomplete(messages, model=model, **params))
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+    def metrics(self):
+        summary = {}
+        with self._metrics_lock:
+            for model, metrics in self._metrics.items():
+                latencies = sorted(metrics['latencies'])
+                summary[model] = {name: value for name, value in metrics.items() if name != 'latencies'}
+                summary[model]['latency_p50'] = latencies[len(latencies) // 2] if latencies else None
+                summary[model]['latency_p95'] = latencies[int(len(latencies) * 0.95)] if latencies else None
+        return summary
+
+    def close(self):
+        if self._loop is not None:
+            self.run(self.backend.close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+# Process-wide client; LLM_BACKEND=stub answers locally instead of calling OpenAI,
+# LLM_CACHE=off disables the persistent response cache
+def get_llm_client():
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            backend = StubBackend() if os.getenv("LLM_BACKEND") == "stub" else OpenAIBackend()
+            cache = None if os.getenv("LLM_CACHE") == "off" else PromptCache()
+            _default_client = LLMClient(backend, cache=cache)
+        return _default_client
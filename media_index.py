@@ -0,0 +1,179 @@
+import bisect
+import json
+import os
+import subprocess
+import threading
+
+import ffmpeg
+
+from content_hash import hash_file
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 2
+# ffmpeg encoders that produce a stream the source's copied GOPs can be concatenated with
+ENCODERS = {'h264': 'libx264', 'hevc': 'libx265', 'mpeg4': 'mpeg4', 'vp9': 'libvpx-vp9', 'av1': 'libaom-av1'}
+# Bitstream filters that repeat a stream's parameter sets in-band, so GOPs from different encoders can be
+# spliced. HEVC is left out: its keyframes are often open-GOP CRA frames whose leading pictures reference
+# the GOP before, which a splice cuts off.
+ANNEXB_FILTERS = {'h264': 'h264_mp4toannexb'}
+# x264 profile names of the H.264 profiles ffprobe reports
+H264_PROFILES = {'Constrained Baseline': 'baseline', 'Baseline': 'baseline', 'Main': 'main', 'High': 'high',
+                 'High 10': 'high10', 'High 4:2:2': 'high422', 'High 4:4:4 Predictive': 'high444'}
+
+_index_memo = {}
+_index_lock = threading.Lock()
+
+
+def index_path_for(video_path):
+    return f"{video_path}{INDEX_SUFFIX}"
+
+
+def _stream_summary(stream):
+    summary = {
+        'index': stream['index'],
+        'codec_type': stream.get('codec_type'),
+        'codec_name': stream.get('codec_name'),
+    }
+    if stream.get('codec_type') == 'video':
+        summary.update({
+            'width': stream.get('width'),
+            'height': stream.get('height'),
+            'pix_fmt': stream.get('pix_fmt'),
+            'frame_rate': stream.get('avg_frame_rate'),
+            'r_frame_rate': stream.get('r_frame_rate'),
+            'time_base': stream.get('time_base'),
+            'profile': stream.get('profile'),
+            'level': stream.get('level'),
+        })
+    elif stream.get('codec_type') == 'audio':
+        summary.update({
+            'sample_rate': int(stream.get('sample_rate', 0)),
+            'channels': stream.get('channels'),
+            'channel_layout': stream.get('channel_layout'),
+        })
+    return summary
+
+
+# Keyframe timestamps and byte offsets of the first video stream, read from packet flags (no decoding)
+def _probe_keyframes(video_path):
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,pos,flags",
+         "-of", "csv=p=0", video_path],
+        capture_output=True, text=True, check=True).stdout
+    keyframes = []
+    for line in output.splitlines():
+        fields = line.split(",")
+        if len(fields) < 3 or "K" not in fields[2] or fields[0] in ("", "N/A"):
+            continue
+        keyframes.append([float(fields[0]), int(fields[1]) if fields[1].isdigit() else None])
+    keyframes.sort()
+    return keyframes
+
+
+# Probe a video once with ffprobe: duration, streams, audio layout and keyframes
+def build_media_index(video_path, content_hash=None):
+    stat = os.stat(video_path)
+    probe = ffmpeg.probe(video_path)
+    streams = [_stream_summary(stream) for stream in probe['streams']]
+    return {
+        'version': INDEX_VERSION,
+        'content_hash': content_hash or hash_file(video_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'duration': float(probe['format']['duration']),
+        'format': probe['format'].get('format_name'),
+        'streams': streams,
+        'video': next((s for s in streams if s['codec_type'] == 'video'), None),
+        'audio': next((s for s in streams if s['codec_type'] == 'audio'), None),
+        'keyframes': _probe_keyframes(video_path) if any(s['codec_type'] == 'video' for s in streams) else [],
+    }
+
+
+def _read_index(index_path):
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return index if index.get('version') == INDEX_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def _write_index(index_path, index):
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"Could not store media index {index_path}: {e}")
+
+
+# Load the metadata index stored next to the video, rebuilding it when the file's content hash
+# changed. An unchanged size and mtime is trusted without re-hashing.
+def load_media_index(video_path):
+    stat = os.stat(video_path)
+    memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    with _index_lock:
+        if memo_key in _index_memo:
+            return _index_memo[memo_key]
+
+        index_path = index_path_for(video_path)
+        index = _read_index(index_path)
+        if index is None or (index['size'], index['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            content_hash = hash_file(video_path)
+            if index is None or index['content_hash'] != content_hash:
+                index = build_media_index(video_path, content_hash)
+            else:
+                index.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            _write_index(index_path, index)
+
+        _index_memo[memo_key] = index
+        return index
+
+
+def keyframe_times(index):
+    return [time for time, _ in index['keyframes']]
+
+
+# Latest keyframe at or before t, the point a stream-copy cut actually starts from
+def seek_point(index, t):
+    times = keyframe_times(index)
+    position = bisect.bisect_right(times, t) - 1
+    return times[position] if position >= 0 else 0.0
+
+
+# Encoder settings that match the source's video stream
+def encode_params(index):
+    video = index['video'] or {}
+    params = {'vcodec': ENCODERS.get(video.get('codec_name'), 'libx264')}
+    if video.get('pix_fmt'):
+        params['pix_fmt'] = video['pix_fmt']
+    return params
+
+
+# Encoder settings for re-encoded pieces that are spliced with stream-copied GOPs of the source: codec,
+# pixel format, profile, level and frame rate all match the source. None when the source's codec can't
+# carry its parameter sets in-band or a parameter is unknown, so splicing is unsafe.
+def splice_params(index):
+    video = index['video'] or {}
+    profile = H264_PROFILES.get(video.get('profile'))
+    level = video.get('level')
+    frame_rate = video.get('r_frame_rate')
+    if video.get('codec_name') not in ANNEXB_FILTERS or profile is None:
+        return None
+    if not level or level < 0 or frame_rate in (None, "0/0"):
+        return None
+    # ffprobe reports H.264 levels times ten
+    return dict(encode_params(index), r=frame_rate, level=f"{level / 10:g}", **{'profile:v': profile})
+
+
+# Bitstream filter that makes the source's stream-copied GOPs splicable, or None when splicing is unsafe
+def splice_filter(index):
+    return ANNEXB_FILTERS[index['video']['codec_name']] if splice_params(index) is not None else None
+
+
+# Time scale of the source's video track, so a spliced MP4 keeps the source's timestamps exactly
+def video_timescale(index):
+    time_base = (index['video'] or {}).get('time_base') or ""
+    _, _, denominator = time_base.partition("/")
+    return int(denominator) if denominator.isdigit() else None
@@ -1,7 +1,8 @@
-import whisper
 import ffmpeg
 import os
 
+from model_registry import transcribe_with_whisper
+
 # Step 1: Extract Audio from Video using FFmpeg
 def extract_audio(video_path, output_audio_path):
     try:
@@ -12,8 +13,7 @@ def extract_audio(video_path, output_audio_path):
 
 # Step 2: Transcribe Audio to Text with Segment-Level Timestamps using Whisper
 def transcribe_audio_with_segment_timestamps(audio_path):
-    model = whisper.load_model("base")
-    result = model.transcribe(audio_path, verbose=True)
+    result = transcribe_with_whisper(audio_path, "base", verbose=True)
     
     # Prepare transcription with segment-level timestamps
     transcription_with_timestamps = []                                                                                             
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL", "base")
+# "whisper" runs the fp32 model, "whisper-int8" a dynamically quantized copy for CPU-only nodes
+ASR_BACKEND = os.getenv("ASR_BACKEND", "whisper")
+# torch intra-op threads for transcription; 0 keeps torch's default (one per core)
+ASR_THREADS = int(os.getenv("ASR_THREADS", "0"))
+# Unix socket of a shared model server (model_server.py); unset loads the model in every process
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET")
+
+_models = {}
+_models_lock = threading.Lock()
+_server_state = {'checked': False, 'available': False}
+
+
+# Plain Whisper, fp16 on GPU and fp32 on CPU
+class WhisperASR:
+    name = "whisper"
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.model = self.load()
+
+    def load(self):
+        import whisper
+
+        return whisper.load_model(self.model_name)
+
+    def transcribe(self, audio, **options):
+        return self.model.transcribe(audio, **options)
+
+
+# Whisper with every Linear layer (attention projections and MLPs, most of the compute) dynamically
+# quantized to int8 by torch. Weights are quantized once at load; activations per call. CPU only.
+class QuantizedWhisperASR(WhisperASR):
+    name = "whisper-int8"
+
+    def load(self):
+        import torch
+        import whisper
+
+        model = whisper.load_model(self.model_name, device="cpu")
+        # Whisper's Linear subclass only adds dtype casting for fp16; as plain nn.Linear the layers are
+        # picked up by quantize_dynamic's default module mapping
+        for module in model.modules():
+            if type(module) is whisper.model.Linear:
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def transcribe(self, audio, **options):
+        return self.model.transcribe(audio, **dict(options, fp16=False))
+
+
+ASR_BACKENDS = {"whisper": WhisperASR, "whisper-int8": QuantizedWhisperASR}
+
+
+def set_asr_threads(num_threads):
+    if num_threads and num_threads > 0:
+        import torch
+
+        torch.set_num_threads(num_threads)
+
+
+# ASR backend loaded on first use and shared by everything in this process.
+# whisper (and torch) are only imported here, so importing the app stays fast.
+def get_asr_backend(backend_name=ASR_BACKEND, model_name=WHISPER_MODEL_NAME):
+    if backend_name not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{backend_name}', expected one of {sorted(ASR_BACKENDS)}")
+    with _models_lock:
+        key = (backend_name, model_name)
+        if key not in _models:
+            print(f"Loading Whisper model '{model_name}' with the {backend_name} backend")
+            set_asr_threads(ASR_THREADS)
+            _models[key] = ASR_BACKENDS[backend_name](model_name)
+        return _models[key]
+
+
+def get_whisper_model(model_name=WHISPER_MODEL_NAME):
+    return get_asr_backend("whisper", model_name).model
+
+
+# Identifies what produced a transcript, for cache keys and checkpoints; the fp32 backend keeps the bare model name
+def asr_model_id(backend_name=ASR_BACKEND, model_name=WHISPER_MODEL_NAME):
+    return model_name if backend_name == "whisper" else f"{model_name}:{backend_name}"
+
+
+def loaded_models():
+    return sorted(_models)
+
+
+def _use_model_server():
+    if not MODEL_SERVER_SOCKET:
+        return False
+    if not _server_state['checked']:
+        from model_server import model_server_available
+
+        _server_state['available'] = model_server_available(MODEL_SERVER_SOCKET)
+        _server_state['checked'] = True
+        if not _server_state['available']:
+            print(f"Model server at {MODEL_SERVER_SOCKET} is not reachable, loading models in this process")
+    return _server_state['available']
+
+
+# Transcribe with the shared model server when one is configured and reachable, otherwise with this
+# process's own model. audio is a file path or a 16 kHz float32 buffer.
+def transcribe_with_whisper(audio, model_name=WHISPER_MODEL_NAME, asr_backend=ASR_BACKEND, **options):
+    if _use_model_server():
+        from model_server import transcribe_remote
+
+        try:
+            return transcribe_remote(MODEL_SERVER_SOCKET, audio, model_name, options, asr_backend)
+        except OSError as e:
+            print(f"Model server connection failed ({e}), transcribing in this process")
+            _server_state['available'] = False
+    return get_asr_backend(asr_backend, model_name).transcribe(audio, **options)
+
+
+# Load the model now, e.g. in a worker before it takes jobs, unless a model server will be used
+def preload_whisper_model(model_name=WHISPER_MODEL_NAME, asr_backend=ASR_BACKEND):
+    if not _use_model_server():
+        get_asr_backend(asr_backend, model_name)
+
+
+_STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for module in sys.argv[2:]:
+    __import__(module)
+imported = time.perf_counter() - start
+if sys.argv[1]:
+    from model_registry import preload_whisper_model
+    preload_whisper_model(sys.argv[1])
+rss = None
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmHWM:"):
+            rss = int(line.split()[1]) * 1024
+print(json.dumps({"import_seconds": imported, "ready_seconds": time.perf_counter() - start, "peak_rss_bytes": rss}))
+"""
+
+
+# Cold-start cost of importing modules in a fresh interpreter, optionally followed by loading the model
+def measure_startup(modules, model_name=None, runs=3, env=None):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _STARTUP_PROBE, model_name or "", *modules],
+                                capture_output=True, text=True, check=True, env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    samples.sort(key=lambda sample: sample['ready_seconds'])
+    return samples[len(samples) // 2]
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+# Word error rate: word-level edit distance from the reference, divided by the reference length
+def word_error_rate(reference, hypothesis):
+    reference, hypothesis = _words(reference), _words(hypothesis)
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    previous = list(range(len(hypothesis) + 1))
+    for i, reference_word in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hypothesis_word in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (reference_word != hypothesis_word))
+        previous = current
+    return previous[-1] / len(reference)
+
+
+# Audio files of a corpus directory, each with its reference transcript when <name>.txt exists next to it
+def load_asr_corpus(corpus_dir):
+    corpus = []
+    for name in sorted(os.listdir(corpus_dir)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in (".wav", ".mp3", ".flac", ".m4a", ".ogg", ".mp4"):
+            continue
+        reference_path = os.path.join(corpus_dir, f"{stem}.txt")
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, "r", encoding="utf-8") as f:
+                reference = f.read()
+        corpus.append((os.path.join(corpus_dir, name), reference))
+    return corpus
+
+
+# Benchmark: realtime factor and WER of each backend and thread count over a fixed corpus. Files
+# without a reference transcript are scored against the fp32 backend's output instead.
+def run_asr_benchmark(corpus_dir, model_name, backend_names, thread_counts):
+    from audio_io import audio_duration, load_audio_pcm
+
+    corpus = [(path, load_audio_pcm(path), reference) for path, reference in load_asr_corpus(corpus_dir)]
+    if not corpus:
+        print(f"No audio files in {corpus_dir}")
+        return
+    total_duration = sum(audio_duration(audio) for _, audio, _ in corpus)
+    print(f"Corpus: {len(corpus)} files, {total_duration:.1f}s of audio, model '{model_name}'")
+
+    baseline = {}
+    if any(reference is None for _, _, reference in corpus):
+        fp32 = get_asr_backend("whisper", model_name)
+        baseline = {path: fp32.transcribe(audio)['text'] for path, audio, reference in corpus if reference is None}
+
+    print(f"{'backend':<14}{'threads':>8}{'load s':>9}{'transcribe s':>14}{'RTF':>8}{'x realtime':>12}{'WER':>8}")
+    for backend_name in backend_names:
+        load_start = time.perf_counter()
+        backend = get_asr_backend(backend_name, model_name)
+        load_seconds = time.perf_counter() - load_start
+        for num_threads in thread_counts:
+            set_asr_threads(num_threads)
+            errors = []
+            start = time.perf_counter()
+            for path, audio, reference in corpus:
+                hypothesis = backend.transcribe(audio)['text']
+                errors.append(word_error_rate(reference if reference is not None else baseline[path], hypothesis))
+            seconds = time.perf_counter() - start
+            print(f"{backend_name:<14}{num_threads:>8}{load_seconds:>9.1f}{seconds:>14.1f}"
+                  f"{seconds / total_duration:>8.3f}{total_duration / seconds:>12.1f}{sum(errors) / len(errors):>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model startup and ASR backend benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    startup = commands.add_parser("startup", help="measure app cold-start time and per-worker memory")
+    startup.add_argument("--modules", nargs="+", default=["backend", "frontend"])
+    startup.add_argument("--model", default=WHISPER_MODEL_NAME)
+    startup.add_argument("--runs", type=int, default=3)
+
+    asr = commands.add_parser("asr", help="compare WER and realtime factor of ASR backends on an audio corpus")
+    asr.add_argument("corpus_dir", help="directory of audio files, with optional <name>.txt reference transcripts")
+    asr.add_argument("--model", default=WHISPER_MODEL_NAME)
+    asr.add_argument("--backends", nargs="+", default=list(ASR_BACKENDS), choices=list(ASR_BACKENDS))
+    asr.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    if args.command == "asr":
+        run_asr_benchmark(args.corpus_dir, args.model, args.backends, args.threads)
+    else:
+        cases = [("import only", None, None), ("import + local model", args.model, None)]
+        if MODEL_SERVER_SOCKET:
+            cases.append(("import + model server", args.model, dict(os.environ, MODEL_SERVER_SOCKET=MODEL_SERVER_SOCKET)))
+        for module in args.modules:
+            for label, model_name, env in cases:
+                sample = measure_startup([module], model_name, args.runs, env)
+                rss = f"{sample['peak_rss_bytes'] / 2 ** 20:.0f} MB" if sample['peak_rss_bytes'] else "n/a"
+                print(f"{module:<10} {label:<24} import {sample['import_seconds']:.2f}s  "
+                      f"ready {sample['ready_seconds']:.2f}s  peak RSS {rss}")
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+DEFAULT_SOCKET_PATH = "/tmp/reels-model-server.sock"
+CONNECT_TIMEOUT_SECONDS = 2.0
+
+_HEADER = struct.Struct(">I")
+
+
+def _json_default(value):
+    # Whisper results can carry NumPy scalars and arrays
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("model server connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+# Messages are a length-prefixed JSON header, optionally followed by header['payload_bytes'] raw bytes
+def _send_message(sock, header, payload=b""):
+    header = dict(header, payload_bytes=len(payload))
+    encoded = json.dumps(header, default=_json_default).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+
+def _recv_message(sock):
+    (length,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    header = json.loads(_recv_exactly(sock, length))
+    payload = _recv_exactly(sock, header['payload_bytes']) if header.get('payload_bytes') else b""
+    return header, payload
+
+
+# Serves transcription requests from the models already loaded in this process. Each model handles
+# one request at a time; clients queue on its lock instead of oversubscribing the CPU.
+class ModelRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        from model_registry import get_asr_backend
+
+        try:
+            header, payload = _recv_message(self.request)
+            if header.get('op') == 'ping':
+                _send_message(self.request, {'ok': True, 'pid': os.getpid()})
+                return
+            if header.get('op') != 'transcribe':
+                raise ValueError(f"Unknown operation {header.get('op')!r}")
+
+            if payload:
+                audio = np.frombuffer(payload, dtype=np.float32)
+            else:
+                audio = header['audio_path']
+            key = (header.get('backend', 'whisper'), header['model'])
+            backend = get_asr_backend(*key)
+            with self.server.model_locks.setdefault(key, threading.Lock()):
+                result = backend.transcribe(audio, **header.get('options', {}))
+            _send_message(self.request, {'ok': True, 'result': result})
+        except Exception as e:
+            try:
+                _send_message(self.request, {'ok': False, 'error': f"{type(e).__name__}: {e}"})
+            except OSError:
+                pass
+
+
+# Start the model server on a Unix socket, loading the given models with each ASR backend first;
+# serves on a background thread
+def start_model_server(socket_path=DEFAULT_SOCKET_PATH, model_names=(), backend_names=("whisper",)):
+    from model_registry import get_asr_backend
+
+    for model_name in model_names:
+        for backend_name in backend_names:
+            get_asr_backend(backend_name, model_name)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socketserver.ThreadingUnixStreamServer(socket_path, ModelRequestHandler)
+    server.daemon_threads = True
+    server.model_locks = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _connect(socket_path, timeout=None):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    sock.settimeout(timeout)
+    return sock
+
+
+def model_server_available(socket_path):
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return False
+    try:
+        with _connect(socket_path, CONNECT_TIMEOUT_SECONDS) as sock:
+            _send_message(sock, {'op': 'ping'})
+            header, _ = _recv_message(sock)
+            return header.get('ok', False)
+    except OSError:
+        return False
+
+
+# Transcribe through the model server; audio is a file path or a 16 kHz float32 buffer
+def transcribe_remote(socket_path, audio, model_name, options=None, asr_backend="whisper"):
+    header = {'op': 'transcribe', 'model': model_name, 'backend': asr_backend, 'options': options or {}}
+    payload = b""
+    if isinstance(audio, str):
+        header['audio_path'] = os.path.abspath(audio)
+    else:
+        payload = np.ascontiguousarray(audio, dtype=np.float32).tobytes()
+
+    with _connect(socket_path) as sock:
+        _send_message(sock, header, payload)
+        response, _ = _recv_message(sock)
+    if not response.get('ok'):
+        raise RuntimeError(f"Model server failed to transcribe: {response.get('error')}")
+    return response['result']
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve preloaded Whisper models to app workers over a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    parser.add_argument("--models", nargs="+", default=["base"])
+    parser.add_argument("--backends", nargs="+", default=["whisper"], help="ASR backends to preload for each model")
+    args = parser.parse_args()
+    server = start_model_server(args.socket, args.models, args.backends)
+    print(f"Model server with {', '.join(args.models)} listening on {args.socket} (pid {os.getpid()})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        os.remove(args.socket)
@@ -0,0 +1,149 @@
+import contextvars
+import queue
+import threading
+import time
+
+# Items buffered between two stages before the producer blocks (backpressure)
+QUEUE_SIZE = 64
+
+_END = object()
+
+
+# One step of a streaming pipeline. process(item, emit) handles one input item and calls emit()
+# for each output; finish(emit), if given, runs once the input is exhausted to flush leftovers.
+class Stage:
+    def __init__(self, name, process, finish=None):
+        self.name = name
+        self.process = process
+        self.finish = finish
+
+
+# Timing for one stage, relative to the start of the pipeline; CPU time is the stage thread's own
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.first_output_at = None
+        self.finished_at = None
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'first_output_at': None if self.first_output_at is None else round(self.first_output_at, 3),
+            'finished_at': None if self.finished_at is None else round(self.finished_at, 3),
+        }
+
+
+# Run source -> stages[0] -> stages[1] -> ... with one thread per step and bounded queues between them,
+# so later stages work on early items while earlier stages are still producing. Returns the last
+# stage's outputs and per-stage stats; the first exception raised by any step is re-raised.
+def run_pipeline(source_name, source, stages, queue_size=QUEUE_SIZE):
+    started = time.perf_counter()
+    stats = [StageStats(source_name)] + [StageStats(stage.name) for stage in stages]
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results = []
+    errors = []
+    failed = threading.Event()
+
+    def make_emit(step_stats, output_queue):
+        def emit(item):
+            if step_stats.first_output_at is None:
+                step_stats.first_output_at = time.perf_counter() - started
+            step_stats.items_out += 1
+            if output_queue is None:
+                results.append(item)
+            else:
+                output_queue.put(item)
+        return emit
+
+    def run_source():
+        source_stats = stats[0]
+        emit = make_emit(source_stats, queues[0] if queues else None)
+        try:
+            iterator = iter(source)
+            while not failed.is_set():
+                tick = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    source_stats.busy_seconds += time.perf_counter() - tick
+                source_stats.items_in += 1
+                emit(item)
+        except Exception as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            source_stats.cpu_seconds = time.thread_time()
+            source_stats.finished_at = time.perf_counter() - started
+            if queues:
+                queues[0].put(_END)
+
+    def run_stage(position):
+        stage = stages[position]
+        stage_stats = stats[position + 1]
+        input_queue = queues[position]
+        output_queue = queues[position + 1] if position + 1 < len(queues) else None
+        emit = make_emit(stage_stats, output_queue)
+        try:
+            while True:
+                item = input_queue.get()
+                if item is _END:
+                    break
+                # After a failure keep draining so upstream threads never block on a full queue
+                if failed.is_set():
+                    continue
+                stage_stats.items_in += 1
+                tick = time.perf_counter()
+                try:
+                    stage.process(item, emit)
+                finally:
+                    stage_stats.busy_seconds += time.perf_counter() - tick
+            if stage.finish is not None and not failed.is_set():
+                tick = time.perf_counter()
+                try:
+                    stage.finish(emit)
+                finally:
+                    stage_stats.busy_seconds += time.perf_counter() - tick
+        except Exception as e:
+            errors.append(e)
+            failed.set()
+            while input_queue.get() is not _END:
+                pass
+        finally:
+            stage_stats.cpu_seconds = time.thread_time()
+            stage_stats.finished_at = time.perf_counter() - started
+            if output_queue is not None:
+                output_queue.put(_END)
+
+    # Each thread runs in a copy of the caller's context, so stages report to the caller's job metrics
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(run_source,),
+                                name=f"pipeline-{source_name}")]
+    threads += [threading.Thread(target=contextvars.copy_context().run, args=(run_stage, i),
+                                 name=f"pipeline-{stage.name}")
+                for i, stage in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return results, [stage_stats.as_dict() for stage_stats in stats]
+
+
+def format_stage_report(stage_stats):
+    lines = [f"{'stage':<14}{'items in':>10}{'items out':>11}{'busy s':>9}{'cpu s':>8}{'first out s':>13}{'done s':>9}"]
+    for entry in stage_stats:
+        first_output = '-' if entry['first_output_at'] is None else f"{entry['first_output_at']:.2f}"
+        lines.append(f"{entry['stage']:<14}{entry['items_in']:>10}{entry['items_out']:>11}"
+                     f"{entry['busy_seconds']:>9.2f}{entry['cpu_seconds']:>8.2f}{first_output:>13}{entry['finished_at']:>9.2f}")
+    return "\n".join(lines)
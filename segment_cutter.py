@@ -0,0 +1,232 @@
+import argparse
+import bisect
+import concurrent.futures
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import ffmpeg
+
+from audio_io import probe_duration
+from media_index import keyframe_times, load_media_index, seek_point
+
+# Upper bound on concurrent ffmpeg processes so large jobs don't oversubscribe disk and CPU
+MAX_CUT_WORKERS = min(4, os.cpu_count() or 1)
+# Segments cut by one filter-graph invocation when re-encoding
+REENCODE_GROUP_SIZE = 16
+# Segments further apart than this are cut by separate invocations; one decode of the stretch between
+# them would cost more than seeking to each
+REENCODE_MAX_GROUP_GAP = 10.0
+# Segments further apart than this are stream-copied by separate invocations, each seeking to its first
+# segment, rather than one invocation rewriting the whole stretch between them
+COPY_MAX_GROUP_GAP = 10.0
+# Slack when comparing split times with the keyframe timestamps the segment muxer reports
+SPLIT_TOLERANCE = 0.01
+
+
+def segment_output_path(segment, output_dir):
+    return os.path.join(output_dir, f"segment_{segment['start']:.2f}_{segment['end']:.2f}.mp4")
+
+
+# Cut one segment with its own ffmpeg process
+def cut_single_segment(video_path, segment, output_dir, mode="copy"):
+    output_path = segment_output_path(segment, output_dir)
+    try:
+        if mode == "copy":
+            # Start on the keyframe stream copy would snap to anyway, so there are no broken leading frames
+            start = seek_point(load_media_index(video_path), segment['start'])
+            ffmpeg.input(video_path, ss=start, to=segment['end']).output(output_path, c='copy').run(
+                overwrite_output=True, quiet=True)
+        else:
+            ffmpeg.input(video_path, ss=segment['start'], t=segment['end'] - segment['start']).output(output_path).run(
+                overwrite_output=True, quiet=True)
+        return output_path
+    except Exception as e:
+        print(f"Error creating segment file: {e}")
+        return None
+
+
+# Split segments (sorted by start) into a non-overlapping run and the ones that overlap it
+def _split_overlapping(segments):
+    mergeable = []
+    overlapping = []
+    last_end = float('-inf')
+    for segment in sorted(segments, key=lambda s: s['start']):
+        if segment['start'] >= last_end:
+            mergeable.append(segment)
+            last_end = segment['end']
+        else:
+            overlapping.append(segment)
+    return mergeable, overlapping
+
+
+# Stream-copy a group of segments (sorted, not overlapping) in one pass with the segment muxer. Stream
+# copy can only split on keyframes, so the input seeks to the keyframe at or before the first segment's
+# start and is split at the keyframe at or before each segment's start (where cut_single_segment would
+# start too) and at the first keyframe after its end. A segment gets the piece starting at its split if
+# that piece covers the whole segment; segments sharing a GOP with a neighbour don't, and are left to
+# the caller.
+def _cut_with_segment_muxer(video_path, segments, output_dir):
+    index = load_media_index(video_path)
+    times = keyframe_times(index)
+    starts = {id(segment): seek_point(index, segment['start']) for segment in segments}
+    base = min(starts.values())
+    split_times = set(starts.values())
+    for segment in segments:
+        position = bisect.bisect_left(times, segment['end'])
+        if position < len(times):
+            split_times.add(times[position])
+    # Relative to the seek point, and just before each keyframe so rounding can't push the split onto the next one
+    cut_points = sorted(t - base - SPLIT_TOLERANCE / 2 for t in split_times if t > base)
+
+    pieces_dir = tempfile.mkdtemp(prefix="pieces_", dir=output_dir)
+    piece_list = os.path.join(pieces_dir, "pieces.csv")
+    try:
+        (
+            # Timestamps start at the seek point; left unshifted by B-frame and priming delays, the split
+            # times and the piece list stay on that timeline
+            ffmpeg.input(video_path, ss=base, to=segments[-1]['end'])
+            .output(os.path.join(pieces_dir, "piece_%05d.mp4"), f='segment', c='copy', map='0',
+                    segment_times=",".join(f"{t:.6f}" for t in cut_points), reset_timestamps=1,
+                    segment_list=piece_list, segment_list_type='csv', avoid_negative_ts='disabled')
+            .run(overwrite_output=True, quiet=True)
+        )
+        pieces = []
+        with open(piece_list) as f:
+            for line in f:
+                name, piece_start, piece_end = line.strip().rsplit(",", 2)
+                pieces.append((base + float(piece_start), base + float(piece_end), os.path.join(pieces_dir, name)))
+
+        results = {}
+        used = set()
+        for segment in segments:
+            split = starts[id(segment)]
+            for piece_start, piece_end, piece_path in pieces:
+                if abs(piece_start - split) > SPLIT_TOLERANCE:
+                    continue
+                if piece_path not in used and piece_end >= segment['end'] - SPLIT_TOLERANCE:
+                    used.add(piece_path)
+                    output_path = segment_output_path(segment, output_dir)
+                    os.replace(piece_path, output_path)
+                    results[id(segment)] = output_path
+                break
+        return results
+    finally:
+        shutil.rmtree(pieces_dir, ignore_errors=True)
+
+
+# Sorted segments in groups cut by one ffmpeg invocation each: at most group_size segments, with no more than
+# max_gap seconds between one segment's end and the next one's start
+def _group_segments(segments, group_size=REENCODE_GROUP_SIZE, max_gap=REENCODE_MAX_GROUP_GAP):
+    groups = []
+    for segment in sorted(segments, key=lambda s: s['start']):
+        group = groups[-1] if groups else None
+        if (group and len(group) < group_size
+                and segment['start'] - max(s['end'] for s in group) <= max_gap):
+            group.append(segment)
+        else:
+            groups.append([segment])
+    return groups
+
+
+# Re-encode a group of segments with one decode: the input is split in a filter graph and each
+# branch is trimmed to one segment and written to its own output
+def _cut_with_filter_graph(video_path, segments, output_dir):
+    first_start = min(segment['start'] for segment in segments)
+    last_end = max(segment['end'] for segment in segments)
+    source = ffmpeg.input(video_path, ss=first_start, to=last_end)
+    video_branches = source.video.filter_multi_output('split', len(segments))
+    audio_branches = source.audio.filter_multi_output('asplit', len(segments))
+
+    outputs = []
+    results = {}
+    for branch, segment in enumerate(segments):
+        start = segment['start'] - first_start
+        end = segment['end'] - first_start
+        video = video_branches[branch].trim(start=start, end=end).setpts('PTS-STARTPTS')
+        audio = audio_branches[branch].filter('atrim', start=start, end=end).filter('asetpts', 'PTS-STARTPTS')
+        output_path = segment_output_path(segment, output_dir)
+        outputs.append(ffmpeg.output(video, audio, output_path))
+        results[id(segment)] = output_path
+    ffmpeg.merge_outputs(*outputs).run(overwrite_output=True, quiet=True)
+    return results
+
+
+# Cut every segment with as few ffmpeg processes as possible, grouping segments that lie close together
+# in the source. mode="copy" stream-copies each group through the segment muxer (cuts snap to keyframes,
+# like c='copy'); mode="reencode" is frame-accurate and uses filter graphs of up to group_size segments.
+# Segments that can't be merged, or whose group failed, are cut one by one in a bounded pool. Returns
+# output paths in input order (None on failure).
+def cut_segments(video_path, segments, output_dir="segments", mode="copy", group_size=REENCODE_GROUP_SIZE,
+                 max_workers=MAX_CUT_WORKERS):
+    os.makedirs(output_dir, exist_ok=True)
+    if not segments:
+        return []
+
+    results = {}
+    if mode == "copy":
+        mergeable, leftovers = _split_overlapping(segments)
+        groups = _group_segments(mergeable, len(mergeable), COPY_MAX_GROUP_GAP)
+        cut_group = _cut_with_segment_muxer
+    else:
+        leftovers = []
+        groups = _group_segments(segments, group_size)
+        cut_group = _cut_with_filter_graph
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_group = {executor.submit(cut_group, video_path, group, output_dir): group for group in groups}
+        for future in concurrent.futures.as_completed(future_to_group):
+            try:
+                results.update(future.result())
+            except Exception as e:
+                print(f"Error cutting segment group, falling back to one process per segment: {e}")
+    leftovers += [segment for group in groups for segment in group if id(segment) not in results]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_segment = {executor.submit(cut_single_segment, video_path, segment, output_dir, mode): segment
+                             for segment in leftovers}
+        for future in concurrent.futures.as_completed(future_to_segment):
+            results[id(future_to_segment[future])] = future.result()
+
+    return [results.get(id(segment)) for segment in segments]
+
+
+# Benchmark: one process per segment (the previous approach) against cut_segments
+def run_benchmark(video_path, segment_count, segment_seconds, mode, seed=0):
+    rng = random.Random(seed)
+    duration = probe_duration(video_path)
+    starts = sorted(rng.uniform(0, max(0.0, duration - segment_seconds)) for _ in range(segment_count))
+    segments = []
+    last_end = 0.0
+    for start in starts:
+        start = max(start, last_end)
+        if start + segment_seconds > duration:
+            break
+        segments.append({'start': round(start, 2), 'end': round(start + segment_seconds, 2)})
+        last_end = start + segment_seconds
+
+    with tempfile.TemporaryDirectory() as per_segment_dir, tempfile.TemporaryDirectory() as batched_dir:
+        start_time = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            list(executor.map(lambda s: cut_single_segment(video_path, s, per_segment_dir, mode), segments))
+        per_segment_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        cut_segments(video_path, segments, batched_dir, mode=mode)
+        batched_seconds = time.perf_counter() - start_time
+
+    print(f"{len(segments)} segments of {segment_seconds}s from a {duration:.0f}s source ({mode})")
+    print(f"One process per segment: {per_segment_seconds:.2f}s")
+    print(f"Batched cutting:         {batched_seconds:.2f}s")
+    print(f"Speedup: {per_segment_seconds / batched_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched segment cutting against one ffmpeg per segment")
+    parser.add_argument("video_path")
+    parser.add_argument("--segments", type=int, default=30)
+    parser.add_argument("--segment-seconds", type=float, default=5.0)
+    parser.add_argument("--mode", choices=["copy", "reencode"], default="copy")
+    args = parser.parse_args()
+    run_benchmark(args.video_path, args.segments, args.segment_seconds, args.mode)
@@ -0,0 +1,123 @@
+import argparse
+import collections
+import random
+import time
+
+import numpy as np
+
+from keyword_index import tokenize
+
+DEFAULT_BACKEND = "lexicon"
+# Texts whose polarity each backend remembers; backends live as long as the job worker, so the least
+# recently used texts are dropped beyond this
+MEMO_SIZE = 20000
+
+
+# Flatten TextBlob's pattern lexicon to word -> polarity, averaged over parts of speech
+def load_textblob_lexicon():
+    from textblob.en import sentiment as pattern_sentiment
+    pattern_sentiment.load()
+    lexicon = {}
+    for word, senses in dict.items(pattern_sentiment):
+        scores = senses.get(None) or next(iter(senses.values()), None)
+        if scores:
+            lexicon[word.lower()] = float(scores[0])
+    return lexicon
+
+
+# Polarities of texts, taken from an LRU memo where present; compute(pending) scores the others
+def _memoized_polarities(memo, texts, compute, memo_size=MEMO_SIZE):
+    pending = list(dict.fromkeys(text for text in texts if text not in memo))
+    if pending:
+        memo.update(zip(pending, compute(pending)))
+    polarities = np.array([memo[text] for text in texts], dtype=np.float64)
+    for text in texts:
+        memo.move_to_end(text)
+    while len(memo) > memo_size:
+        memo.popitem(last=False)
+    return polarities
+
+
+# Batch sentiment from a precompiled lexicon: tokens are mapped to ids once, then polarities are
+# gathered and averaged per text with NumPy. Unlike TextBlob it ignores negation and intensifiers.
+class LexiconSentiment:
+    def __init__(self, lexicon=None):
+        lexicon = lexicon if lexicon is not None else load_textblob_lexicon()
+        words = sorted(lexicon)
+        self.vocabulary = {word: word_id for word_id, word in enumerate(words)}
+        self.polarities = np.array([lexicon[word] for word in words], dtype=np.float64)
+        self._memo = collections.OrderedDict()
+
+    def _score(self, texts):
+        word_ids = []
+        owners = []
+        for owner, text in enumerate(texts):
+            for token in tokenize(text):
+                word_id = self.vocabulary.get(token)
+                if word_id is not None:
+                    word_ids.append(word_id)
+                    owners.append(owner)
+        word_ids = np.array(word_ids, dtype=np.intp)
+        owners = np.array(owners, dtype=np.intp)
+        sums = np.bincount(owners, weights=self.polarities[word_ids], minlength=len(texts))
+        counts = np.bincount(owners, minlength=len(texts))
+        polarities = np.divide(sums, counts, out=np.zeros(len(texts)), where=counts > 0)
+        return np.clip(polarities, -1.0, 1.0).tolist()
+
+    def polarity_batch(self, texts):
+        return _memoized_polarities(self._memo, texts, self._score)
+
+
+# The original per-text TextBlob analysis behind the same batch interface
+class TextBlobSentiment:
+    def __init__(self):
+        self._memo = collections.OrderedDict()
+
+    def polarity_batch(self, texts):
+        from textblob import TextBlob
+
+        return _memoized_polarities(self._memo, texts,
+                                    lambda pending: [TextBlob(text).sentiment.polarity for text in pending])
+
+
+SENTIMENT_BACKENDS = {"lexicon": LexiconSentiment, "textblob": TextBlobSentiment}
+_backends = {}
+
+
+def get_sentiment_backend(name=DEFAULT_BACKEND):
+    if name not in _backends:
+        if name not in SENTIMENT_BACKENDS:
+            raise ValueError(f"Unknown sentiment backend '{name}', expected one of {sorted(SENTIMENT_BACKENDS)}")
+        _backends[name] = SENTIMENT_BACKENDS[name]()
+    return _backends[name]
+
+
+# Polarity of every text as a NumPy array
+def analyze_sentiment_batch(texts, backend=DEFAULT_BACKEND):
+    return get_sentiment_backend(backend).polarity_batch(list(texts))
+
+
+# Benchmark: throughput of each backend on a synthetic corpus, with and without repeated texts
+def run_benchmark(corpus_size, seed=0):
+    rng = random.Random(seed)
+    lexicon_words = sorted(load_textblob_lexicon())
+    filler = ["the", "we", "then", "video", "today", "really", "going", "to", "show", "you"]
+    corpus = [" ".join(rng.choice(lexicon_words if rng.random() < 0.3 else filler) for _ in range(rng.randint(6, 18)))
+              for _ in range(corpus_size)]
+
+    for name, backend_class in SENTIMENT_BACKENDS.items():
+        backend = backend_class()
+        start_time = time.perf_counter()
+        backend.polarity_batch(corpus)
+        cold_seconds = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        backend.polarity_batch(corpus)
+        warm_seconds = time.perf_counter() - start_time
+        print(f"{name:>8}: {corpus_size / cold_seconds:,.0f} segments/s cold, {corpus_size / warm_seconds:,.0f} segments/s memoized")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batch sentiment backends")
+    parser.add_argument("--segments", type=int, default=50000)
+    args = parser.parse_args()
+    run_benchmark(args.segments)
@@ -0,0 +1,133 @@
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import re
+import time
+
+import ffmpeg
+
+from audio_io import probe_duration, read_audio_window
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 1) // 4)
+TARGET_SHARD_SECONDS = 120.0
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_SECONDS = 0.4
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?\d+(?:\.\d+)?)")
+
+# Whisper model loaded once per worker process by _init_worker
+_worker_model = None
+
+
+# Find silent stretches of audio with ffmpeg's silencedetect filter
+def detect_silences(audio_path, noise_db=SILENCE_NOISE_DB, min_silence=SILENCE_MIN_SECONDS, duration=None):
+    _, err = (
+        ffmpeg.input(audio_path)
+        .audio.filter('silencedetect', noise=f'{noise_db}dB', d=min_silence)
+        .output('-', format='null')
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    silences = []
+    silence_start = None
+    for kind, value in _SILENCE_RE.findall(err.decode('utf-8', errors='ignore')):
+        if kind == 'start':
+            silence_start = max(0.0, float(value))
+        elif silence_start is not None:
+            silences.append((silence_start, float(value)))
+            silence_start = None
+    if silence_start is not None and duration is not None:
+        silences.append((silence_start, duration))
+    return silences
+
+
+# Split [0, duration) into shards of roughly target_seconds, cutting in the middle of silences
+def plan_shards(duration, silences, target_seconds=TARGET_SHARD_SECONDS):
+    cut_points = [(start + end) / 2 for start, end in silences]
+    shards = []
+    shard_start = 0.0
+    while duration - shard_start > target_seconds * 1.5:
+        target = shard_start + target_seconds
+        candidates = [t for t in cut_points if target_seconds / 2 <= t - shard_start <= target_seconds * 1.5]
+        cut = min(candidates, key=lambda t: abs(t - target)) if candidates else target
+        shards.append((shard_start, cut))
+        shard_start = cut
+    shards.append((shard_start, duration))
+    return shards
+
+
+# Each worker holds its own model (not the shared model server) so shards really run in parallel
+def _init_worker(model_name, num_threads, asr_backend):
+    global _worker_model
+    from model_registry import get_asr_backend, set_asr_threads
+    set_asr_threads(num_threads)
+    _worker_model = get_asr_backend(asr_backend, model_name)
+
+
+def _transcribe_shard(audio_path, start, end, options):
+    audio = read_audio_window(audio_path, start, end - start)
+    if audio.size == 0:
+        return []
+    result = _worker_model.transcribe(audio, **options)
+    segments = []
+    for segment in result['segments']:
+        text = segment['text'].strip()
+        if text:
+            segments.append({
+                'start': start + segment['start'],
+                'end': min(start + segment['end'], end),
+                'text': text
+            })
+    return segments
+
+
+# Transcribe audio shards in a process pool and merge them into one segment list in source time
+def transcribe_sharded(audio_path, model_name="base", workers=DEFAULT_WORKERS, options=None,
+                       target_shard_seconds=TARGET_SHARD_SECONDS, asr_backend="whisper"):
+    options = options or {}
+    duration = probe_duration(audio_path)
+    shards = plan_shards(duration, detect_silences(audio_path, duration=duration), target_shard_seconds)
+    workers = max(1, min(workers, len(shards)))
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    print(f"Transcribing {len(shards)} shards with {workers} workers ({threads_per_worker} threads each)")
+
+    # Spawn rather than fork so each worker gets a clean torch runtime
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_name, threads_per_worker, asr_backend),
+    ) as executor:
+        futures = [executor.submit(_transcribe_shard, audio_path, start, end, options) for start, end in shards]
+        shard_segments = [future.result() for future in futures]
+
+    return [segment for segments in shard_segments for segment in segments]
+
+
+# Benchmark: compare the serial whole-file path with the sharded engine on one audio file
+def run_benchmark(audio_path, model_name, workers):
+    from model_registry import get_whisper_model
+
+    start_time = time.perf_counter()
+    model = get_whisper_model(model_name)
+    serial_segments = model.transcribe(audio_path)['segments']
+    serial_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    sharded_segments = transcribe_sharded(audio_path, model_name, workers)
+    sharded_seconds = time.perf_counter() - start_time
+
+    duration = probe_duration(audio_path)
+    print(f"Audio duration: {duration:.1f}s")
+    print(f"Serial:  {serial_seconds:.1f}s ({duration / serial_seconds:.2f}x realtime, {len(serial_segments)} segments)")
+    print(f"Sharded: {sharded_seconds:.1f}s ({duration / sharded_seconds:.2f}x realtime, {len(sharded_segments)} segments, {workers} workers)")
+    print(f"Speedup: {serial_seconds / sharded_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sharded Whisper transcription against the serial path")
+    parser.add_argument("audio_path")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    run_benchmark(args.audio_path, args.model, args.workers)
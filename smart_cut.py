@@ -0,0 +1,100 @@
+import bisect
+import concurrent.futures
+import os
+import shutil
+import tempfile
+
+import ffmpeg
+
+from media_index import encode_params, keyframe_times, load_media_index, splice_filter, splice_params, video_timescale
+from segment_cutter import MAX_CUT_WORKERS, segment_output_path
+
+# Edges shorter than this are dropped instead of re-encoded
+MIN_EDGE_SECONDS = 0.05
+
+
+# Timestamps of the video keyframes, from the source's persisted media index
+def probe_keyframes(video_path):
+    return keyframe_times(load_media_index(video_path))
+
+
+# Encoder settings that match the source's video stream; for sources that can be spliced they also match
+# the stream parameters the copied GOPs were encoded with
+def video_encode_params(video_path):
+    index = load_media_index(video_path)
+    return dict(splice_params(index) or encode_params(index), acodec='aac')
+
+
+def _encode_part(video_path, start, end, output_path, params):
+    ffmpeg.input(video_path, ss=start, t=end - start).output(output_path, **params).run(
+        overwrite_output=True, quiet=True)
+
+
+def _copy_part(video_path, start, end, output_path, annexb_filter):
+    # Input seeking to an exact keyframe lets the video be copied; audio is re-encoded so it
+    # joins cleanly with the re-encoded edges
+    ffmpeg.input(video_path, ss=start, t=end - start).output(
+        output_path, vcodec='copy', acodec='aac', **{'bsf:v': annexb_filter}).run(overwrite_output=True, quiet=True)
+
+
+# Frame-accurate cut of one segment: GOPs fully inside the segment are stream-copied and only the
+# partial GOPs at each edge are re-encoded with the source's stream parameters. The pieces are joined as
+# MPEG-TS, which carries every piece's parameter sets in-band, so the copied GOPs are never decoded with
+# the encoder's. Falls back to re-encoding the whole segment when the source can't be spliced safely.
+def smart_cut_segment(video_path, segment, output_path, keyframes, params):
+    start, end = segment['start'], segment['end']
+    index = load_media_index(video_path)
+    annexb_filter = splice_filter(index)
+    first = bisect.bisect_left(keyframes, start)
+    last = bisect.bisect_right(keyframes, end) - 1
+    copy_start = keyframes[first] if first < len(keyframes) else None
+    copy_end = keyframes[last] if last >= 0 else None
+    if annexb_filter is None or copy_start is None or copy_end is None or copy_end <= copy_start:
+        _encode_part(video_path, start, end, output_path, params)
+        return output_path
+
+    parts_dir = tempfile.mkdtemp(prefix="smartcut_", dir=os.path.dirname(output_path) or ".")
+    try:
+        parts = []
+        if copy_start - start >= MIN_EDGE_SECONDS:
+            parts.append(os.path.join(parts_dir, "head.ts"))
+            _encode_part(video_path, start, copy_start, parts[-1], params)
+        parts.append(os.path.join(parts_dir, "middle.ts"))
+        _copy_part(video_path, copy_start, copy_end, parts[-1], annexb_filter)
+        if end - copy_end >= MIN_EDGE_SECONDS:
+            parts.append(os.path.join(parts_dir, "tail.ts"))
+            _encode_part(video_path, copy_end, end, parts[-1], params)
+
+        list_file = os.path.join(parts_dir, "parts.txt")
+        with open(list_file, "w") as f:
+            for part in parts:
+                f.write(f"file '{os.path.abspath(part)}'\n")
+        options = {'bsf:a': 'aac_adtstoasc'}
+        if video_timescale(index):
+            options['video_track_timescale'] = video_timescale(index)
+        ffmpeg.input(list_file, format='concat', safe=0).output(output_path, c='copy', **options).run(
+            overwrite_output=True, quiet=True)
+        return output_path
+    except Exception as e:
+        print(f"Smart cut failed for {segment['start']:.2f}-{segment['end']:.2f}, re-encoding the whole segment: {e}")
+        _encode_part(video_path, start, end, output_path, params)
+        return output_path
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+# Smart-cut every segment, indexing the source's keyframes once. Returns output paths in input order.
+def smart_cut_segments(video_path, segments, output_dir="segments", max_workers=MAX_CUT_WORKERS):
+    os.makedirs(output_dir, exist_ok=True)
+    keyframes = probe_keyframes(video_path)
+    params = video_encode_params(video_path)
+
+    def cut(segment):
+        try:
+            return smart_cut_segment(video_path, segment, segment_output_path(segment, output_dir), keyframes, params)
+        except Exception as e:
+            print(f"Error creating segment file: {e}")
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(cut, segments))
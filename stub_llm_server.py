@@ -0,0 +1,100 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Words the stub treats as signs of a highlight-worthy moment
+EXCITED_WORDS = {"amazing", "incredible", "wow", "best", "important", "key", "love", "great", "finally", "win"}
+
+_SEGMENT_LINE_RE = re.compile(r"^\[(\d+)\]\s*(.*)$", re.MULTILINE)
+
+
+# Deterministic stand-in for the model's judgement of one piece of text
+def stub_score(text):
+    words = re.findall(r"[a-z']+", text.lower())
+    if not words:
+        return 0.0
+    hits = sum(1 for word in words if word in EXCITED_WORDS) + text.count("!")
+    return min(1.0, hits / 3)
+
+
+def stub_reply(messages):
+    prompt = messages[-1]['content'] if messages else ""
+    segment_lines = _SEGMENT_LINE_RE.findall(prompt)
+    if segment_lines and "pair per segment" in prompt:
+        return json.dumps([[int(index), stub_score(text)] for index, text in segment_lines])
+    if segment_lines:
+        return json.dumps([{"index": int(index), "score": stub_score(text)} for index, text in segment_lines])
+    if "respond with 'important'" in prompt:
+        return "important" if stub_score(prompt.split("Segment:", 1)[-1]) >= 0.5 else "not important"
+    if "genre" in prompt.lower():
+        return "education"
+    words = re.findall(r"[a-z']+", prompt.lower())
+    return " ".join(sorted({word for word in words if word in EXCITED_WORDS})) or "highlights"
+
+
+# Minimal OpenAI-compatible /chat/completions endpoint for offline runs and benchmarks
+class StubLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        if self.latency:
+            time.sleep(self.latency)
+
+        messages = body.get('messages', [])
+        content = stub_reply(messages)
+        prompt_tokens = sum(len(message.get('content', '').split()) for message in messages)
+        completion_tokens = len(content.split())
+        payload = json.dumps({
+            "id": "stub-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'stub'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Start the stub server on a background thread; returns the server and its API base URL
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0):
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {"latency": latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+# Point the openai module at a stub server
+def use_stub_llm(api_base):
+    import openai
+
+    openai.api_base = api_base
+    openai.api_key = "stub"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the OpenAI chat completions API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep before each response")
+    args = parser.parse_args()
+    server, api_base = start_stub_server(port=args.port, latency=args.latency)
+    print(f"Stub LLM server listening at {api_base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
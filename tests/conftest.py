@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Local stand-in for a video host: serves files from a dict of path -> (content type, bytes), honours
+# Range requests like a real host does and records every request it gets
+class MediaServer:
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def _respond(self, send_body):
+                server.requests.append((self.command, self.path, self.headers.get('Range')))
+                if self.path not in server.files:
+                    self.send_error(404)
+                    return
+                content_type, content = server.files[self.path]
+                start = 0
+                range_header = self.headers.get('Range')
+                if range_header and range_header.startswith("bytes="):
+                    start = int(range_header[len("bytes="):].split("-")[0] or 0)
+                if start >= len(content) > 0:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f"bytes */{len(content)}")
+                    self.end_headers()
+                    return
+                body = content[start:]
+                self.send_response(206 if range_header else 200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Accept-Ranges', 'bytes')
+                if range_header:
+                    self.send_header('Content-Range', f"bytes {start}-{len(content) - 1}/{len(content)}")
+                self.end_headers()
+                if send_body:
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def add(self, path, content, content_type="video/mp4"):
+        self.files[path] = (content_type, content)
+        return self.url + path
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def media_server():
+    server = MediaServer()
+    yield server
+    server.close()
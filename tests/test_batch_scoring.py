@@ -0,0 +1,79 @@
+import json
+import re
+
+import pytest
+
+from batch_scoring import RESPONSE_TOKENS_PER_SEGMENT, parse_batch_scores, score_batch, score_segments_batched
+from llm_client import LLMClient, StubBackend
+from stub_llm_server import stub_score
+
+TEXTS = ["Welcome back to the channel", "This is the most amazing win ever!", "Let me explain the key idea",
+         "And that's it for today", "Wow, finally, the best part!"]
+
+
+def _batch(texts):
+    return [(index, f"[{index}] {text}") for index, text in enumerate(texts)]
+
+
+# Rough upper bound on cl100k tokens: digits in groups of three, every punctuation mark and whitespace run
+def _approximate_tokens(text):
+    return re.findall(r"\d{1,3}|[^\d\s]|\s+", text)
+
+
+# Answers with pretty-printed [index, score] pairs and stops at max_tokens, the way the model does
+class PrettyPrintingBackend(StubBackend):
+    def __init__(self):
+        super().__init__()
+        self.max_tokens = []
+
+    async def complete(self, model, messages, **params):
+        content, usage = await super().complete(model, messages, **params)
+        self.max_tokens.append(params['max_tokens'])
+        pairs = [[index, round(score, 2)] for index, score in json.loads(content)]
+        tokens = _approximate_tokens(json.dumps(pairs, indent=2))
+        return "".join(tokens[:params['max_tokens']]), usage
+
+
+def test_parse_batch_scores_reads_pairs_and_objects_around_prose():
+    content = 'Here you go:\n[[0, 0.2], {"index": 1, "score": 0.9}, [7, 1.0], [2, 1.5]]\nHope that helps.'
+    assert parse_batch_scores(content, {0, 1, 2}) == {0: 0.2, 1: 0.9, 2: 1.0}
+
+
+def test_parse_batch_scores_salvages_truncated_array():
+    content = json.dumps([[index, 0.5] for index in range(40)], indent=2)[:-40]
+    scores = parse_batch_scores(content, set(range(40)))
+    assert scores and set(scores) < set(range(40))
+    assert set(scores) == set(range(len(scores)))
+
+
+def test_parse_batch_scores_without_array():
+    assert parse_batch_scores("I can't rate these [sorry].", {0}) == {}
+
+
+def test_score_batch_against_stub():
+    client = LLMClient(backend=StubBackend())
+    scores = client.run(score_batch(_batch(TEXTS), client))
+    assert scores == {index: stub_score(text) for index, text in enumerate(TEXTS)}
+
+
+def test_score_batch_leaves_room_for_pretty_printed_answers():
+    backend = PrettyPrintingBackend()
+    client = LLMClient(backend=backend)
+    texts = TEXTS * 16
+    scores = client.run(score_batch(_batch(texts), client))
+    assert backend.max_tokens == [RESPONSE_TOKENS_PER_SEGMENT * len(texts) + 20]
+    assert scores == {index: round(stub_score(text), 2) for index, text in enumerate(texts)}
+
+
+def test_score_segments_batched_falls_back_only_for_missing_segments():
+    pytest.importorskip("tiktoken")
+    segments = [{'text': text} for text in TEXTS]
+    fallback_calls = []
+
+    def fallback(segment):
+        fallback_calls.append(segment['text'])
+        return 0.0
+
+    scores = score_segments_batched(segments, fallback=fallback, client=LLMClient(backend=StubBackend()))
+    assert scores == [stub_score(text) for text in TEXTS]
+    assert fallback_calls == []
@@ -0,0 +1,52 @@
+import json
+
+from importance_map_reduce import parse_chunk_highlights, score_chunk
+from llm_client import LLMClient, StubBackend
+
+TEXTS = [f"Segment {index} is the best part!" for index in range(10)]
+
+
+def _chunk(texts):
+    return [(index, f"[{index}] {text}") for index, text in enumerate(texts)]
+
+
+def _picks(indices):
+    return [{"index": index, "score": 7, "keywords": ["best", f"part {index}"]} for index in indices]
+
+
+# Picks every segment, but runs out of tokens in the middle of a keywords list when asked about more
+# than four segments at once
+class TruncatingBackend(StubBackend):
+    def __init__(self):
+        super().__init__(reply=self._reply)
+        self.chunk_sizes = []
+
+    def _reply(self, messages):
+        indices = [int(line[1:line.index("]")]) for line in messages[-1]['content'].splitlines() if line.startswith("[")]
+        self.chunk_sizes.append(len(indices))
+        content = json.dumps(_picks(indices))
+        return content if len(indices) <= 4 else content[:content.index(f"part {indices[3]}")]
+
+
+def test_parse_chunk_highlights_keeps_picks_before_a_cut():
+    content = json.dumps(_picks(range(5)))
+    content = content[:content.index("part 3")]
+    highlights, complete = parse_chunk_highlights(content, set(range(5)))
+    assert not complete
+    assert [highlight['index'] for highlight in highlights] == [0, 1, 2]
+    assert highlights[0]['keywords'] == ["best", "part 0"]
+
+
+def test_score_chunk_against_stub():
+    client = LLMClient(backend=StubBackend())
+    highlights = client.run(score_chunk(_chunk(TEXTS), "education", client))
+    assert sorted(highlight['index'] for highlight in highlights) == list(range(len(TEXTS)))
+
+
+def test_score_chunk_rescores_halves_of_a_truncated_chunk():
+    backend = TruncatingBackend()
+    client = LLMClient(backend=backend)
+    highlights = client.run(score_chunk(_chunk(TEXTS), "education", client))
+    assert {highlight['index'] for highlight in highlights} == set(range(len(TEXTS)))
+    assert backend.chunk_sizes[0] == len(TEXTS)
+    assert max(backend.chunk_sizes[1:]) <= 5
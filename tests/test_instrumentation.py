@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import instrumentation
+from instrumentation import JobMetrics, measure_stage, render_prometheus
+from pipeline import Stage, run_pipeline
+
+
+class Workspace:
+    def __init__(self, directory):
+        self.job_id = "job-1"
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+
+def _entries(metrics):
+    with open(metrics.path, encoding="utf-8") as f:
+        return {entry['stage']: entry for entry in map(json.loads, f)}
+
+
+def test_outer_stage_keeps_the_peak_it_reached_before_a_nested_stage(tmp_path):
+    if not instrumentation._reset_peak_rss():
+        pytest.skip("the RSS high-water mark can't be reset on this platform")
+    metrics = JobMetrics(Workspace(str(tmp_path)), log_path=None)
+    size = 32 * 2 ** 20
+    with metrics, measure_stage("job"):
+        block = np.ones(size, dtype=np.uint8)
+        del block
+        with measure_stage("nested"):
+            pass
+
+    entries = _entries(metrics)
+    assert entries['job']['peak_rss_bytes'] >= size
+    assert entries['nested']['peak_rss_bytes'] < entries['job']['peak_rss_bytes'] - size / 2
+
+
+def test_stages_in_pipeline_threads_report_to_the_callers_metrics(tmp_path):
+    metrics = JobMetrics(Workspace(str(tmp_path)), log_path=None)
+
+    def process(item, emit):
+        with measure_stage("inner"):
+            emit(item)
+
+    with metrics:
+        run_pipeline("source", iter([1, 2]), [Stage("double", process)])
+
+    with open(metrics.path, encoding="utf-8") as f:
+        assert [json.loads(line)['stage'] for line in f] == ["inner", "inner"]
+
+
+def test_render_prometheus_reads_only_new_entries_and_restarts_on_rotation(tmp_path):
+    log_path = str(tmp_path / "metrics.jsonl")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({'stage': "cut", 'wall_seconds': 1.5, 'peak_rss_bytes': 10}) + "\n")
+    assert 'reel_stage_wall_seconds_total{stage="cut"} 1.5' in render_prometheus(log_path)
+
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({'stage': "cut", 'wall_seconds': 1.0, 'peak_rss_bytes': 20, 'status': 'error'}) + "\n")
+        f.write('{"stage": "cu')
+    text = render_prometheus(log_path)
+    assert 'reel_stage_runs_total{stage="cut"} 2' in text
+    assert 'reel_stage_errors_total{stage="cut"} 1' in text
+    assert 'reel_stage_peak_rss_bytes{stage="cut"} 20' in text
+
+    os.replace(log_path, log_path + ".1")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({'stage': "vad", 'wall_seconds': 2.0}) + "\n")
+    text = render_prometheus(log_path)
+    assert 'stage="cut"' not in text
+    assert 'reel_stage_wall_seconds_total{stage="vad"} 2' in text
@@ -0,0 +1,52 @@
+import shutil
+import subprocess
+
+import pytest
+
+ffmpeg = pytest.importorskip("ffmpeg")
+if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+    pytest.skip("ffmpeg and ffprobe are needed to cut test videos", allow_module_level=True)
+
+import segment_cutter
+from media_index import load_media_index, seek_point
+
+
+# 40 seconds with a keyframe every second
+@pytest.fixture
+def source_video(tmp_path):
+    path = str(tmp_path / "source.mp4")
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=160x120:rate=25:duration=40",
+         "-f", "lavfi", "-i", "sine=duration=40", "-c:v", "libx264", "-g", "25", "-keyint_min", "25",
+         "-sc_threshold", "0", "-pix_fmt", "yuv420p", "-c:a", "aac", path],
+        check=True)
+    return path
+
+
+def _first_frame(path, *input_args):
+    output = subprocess.run(["ffmpeg", "-v", "error", *input_args, "-i", path, "-map", "0:v", "-frames:v", "1",
+                             "-f", "framemd5", "-"], capture_output=True, text=True, check=True).stdout
+    return [line for line in output.splitlines() if not line.startswith("#")][0].split(",")[-1].strip()
+
+
+def test_copy_cuts_each_group_from_its_own_seek_point(source_video, tmp_path, monkeypatch):
+    segments = [{'start': 2.3, 'end': 4.5}, {'start': 5.2, 'end': 6.8}, {'start': 30.4, 'end': 33.0}]
+    groups = []
+    cut_with_segment_muxer = segment_cutter._cut_with_segment_muxer
+
+    def record_group(video_path, group, output_dir):
+        groups.append([segment['start'] for segment in group])
+        return cut_with_segment_muxer(video_path, group, output_dir)
+
+    monkeypatch.setattr(segment_cutter, "_cut_with_segment_muxer", record_group)
+    # Every segment here starts in its own GOP, so none should need a process of its own
+    monkeypatch.setattr(segment_cutter, "cut_single_segment", lambda *args: pytest.fail("fell back to a single cut"))
+    paths = segment_cutter.cut_segments(source_video, segments, str(tmp_path / "segments"), mode="copy")
+
+    assert sorted(groups) == [[2.3, 5.2], [30.4]]
+    index = load_media_index(source_video)
+    for segment, path in zip(segments, paths):
+        start = seek_point(index, segment['start'])
+        duration = float(ffmpeg.probe(path)['format']['duration'])
+        assert start + duration >= segment['end'] - 0.05
+        assert _first_frame(path) == _first_frame(source_video, "-ss", str(start))
@@ -0,0 +1,25 @@
+import collections
+
+from sentiment import LexiconSentiment, _memoized_polarities
+
+LEXICON = {'good': 0.7, 'great': 0.9, 'bad': -0.7}
+
+
+def test_lexicon_polarity_batch_averages_known_words():
+    backend = LexiconSentiment(LEXICON)
+    assert backend.polarity_batch(["good and bad", "great", "nothing here", "great"]).tolist() == [0.0, 0.9, 0.0, 0.9]
+
+
+def test_memo_keeps_only_the_most_recently_used_texts():
+    memo = collections.OrderedDict()
+    computed = []
+
+    def compute(pending):
+        computed.extend(pending)
+        return [len(text) / 10 for text in pending]
+
+    _memoized_polarities(memo, ["a", "bb", "ccc"], compute, memo_size=2)
+    assert list(memo) == ["bb", "ccc"]
+    _memoized_polarities(memo, ["bb", "dddd"], compute, memo_size=2)
+    assert list(memo) == ["bb", "dddd"]
+    assert computed == ["a", "bb", "ccc", "dddd"]
@@ -0,0 +1,67 @@
+import shutil
+import subprocess
+
+import pytest
+
+ffmpeg = pytest.importorskip("ffmpeg")
+if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+    pytest.skip("ffmpeg and ffprobe are needed to cut test videos", allow_module_level=True)
+
+from media_index import load_media_index
+from smart_cut import probe_keyframes, smart_cut_segment, video_encode_params
+
+
+# A source whose stream parameters differ from libx264's defaults: baseline profile, one reference
+# frame, 25 fps in a 1/12800 time base, a keyframe every second
+@pytest.fixture
+def source_video(tmp_path):
+    path = str(tmp_path / "source.mp4")
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=320x240:rate=25:duration=6",
+         "-f", "lavfi", "-i", "sine=frequency=440:duration=6", "-c:v", "libx264", "-profile:v", "baseline",
+         "-level", "3.0", "-x264-params", "keyint=25:min-keyint=25:ref=1", "-pix_fmt", "yuv420p",
+         "-video_track_timescale", "12800", "-c:a", "aac", path],
+        check=True)
+    return path
+
+
+def _decode_errors(path):
+    return subprocess.run(["ffmpeg", "-v", "error", "-i", path, "-f", "null", "-"],
+                          capture_output=True, text=True).stderr
+
+
+def _frame_hashes(path, *input_args):
+    output = subprocess.run(["ffmpeg", "-v", "error", *input_args, "-i", path, "-map", "0:v", "-f", "framemd5", "-"],
+                            capture_output=True, text=True, check=True).stdout
+    return [line.split(",")[-1].strip() for line in output.splitlines() if not line.startswith("#")]
+
+
+def test_smart_cut_output_decodes_cleanly(source_video, tmp_path):
+    output_path = str(tmp_path / "cut.mp4")
+    keyframes = probe_keyframes(source_video)
+
+    smart_cut_segment(source_video, {'start': 0.5, 'end': 4.3}, output_path, keyframes,
+                      video_encode_params(source_video))
+
+    assert _decode_errors(output_path) == ""
+    # The GOPs between the first and last keyframe inside the segment are copied, so they decode to exactly
+    # the source's frames; a corrupted splice or a fallback re-encode would change them
+    source_frames = _frame_hashes(source_video, "-ss", "1", "-t", "3")
+    cut_frames = set(_frame_hashes(output_path))
+    assert all(frame in cut_frames for frame in source_frames)
+    assert load_media_index(output_path)['video']['profile'] == load_media_index(source_video)['video']['profile']
+
+
+# Without a matching encoder profile the segment is re-encoded whole instead of spliced
+def test_smart_cut_reencodes_sources_it_cannot_splice(tmp_path):
+    path = str(tmp_path / "source.mp4")
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=320x240:rate=25:duration=4",
+         "-c:v", "mpeg4", "-g", "25", path],
+        check=True)
+    output_path = str(tmp_path / "cut.mp4")
+
+    smart_cut_segment(path, {'start': 0.5, 'end': 2.3}, output_path, probe_keyframes(path), video_encode_params(path))
+
+    assert _decode_errors(output_path) == ""
+    assert float(ffmpeg.probe(output_path)['format']['duration']) == pytest.approx(1.8, abs=0.1)
@@ -0,0 +1,141 @@
+import json
+import os
+
+import pytest
+
+from video_downloads import MANIFEST_NAME, DownloadManager, downloaded_audio_for, select_formats
+
+# Stand-in for a small MP4; the download path never decodes it
+CLIP = b"\x00\x00\x00\x18ftypmp42" + bytes(range(256)) * 256
+
+
+def test_select_formats_prefers_smallest_large_enough_video_and_separate_audio():
+    formats = [
+        {'format_id': '140', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129, 'filesize': 3000},
+        {'format_id': '139', 'vcodec': 'none', 'acodec': 'mp4a.40.5', 'abr': 48, 'filesize': 1000},
+        {'format_id': '18', 'vcodec': 'avc1', 'acodec': 'mp4a.40.2', 'width': 640, 'height': 360, 'filesize': 9000},
+        {'format_id': '136', 'vcodec': 'avc1', 'acodec': 'none', 'width': 1280, 'height': 720, 'filesize': 20000},
+        {'format_id': '137', 'vcodec': 'avc1', 'acodec': 'none', 'width': 1920, 'height': 1080, 'filesize': 50000},
+    ]
+    video, audio = select_formats(formats, target_resolution=720)
+    assert video['format_id'] == '136'
+    assert audio['format_id'] == '140'
+
+
+def test_select_formats_uses_largest_video_below_target():
+    formats = [
+        {'format_id': 'low', 'vcodec': 'avc1', 'acodec': 'mp4a', 'width': 426, 'height': 240},
+        {'format_id': 'high', 'vcodec': 'avc1', 'acodec': 'mp4a', 'width': 640, 'height': 360},
+    ]
+    video, audio = select_formats(formats, target_resolution=720)
+    assert video['format_id'] == 'high'
+    assert audio is None
+
+
+# Direct links and the generic extractor do not know the codecs: vcodec is None and acodec is missing
+def test_select_formats_treats_unknown_codecs_as_progressive():
+    video, audio = select_formats([{'format_id': 'mp4', 'url': 'http://example.com/clip.mp4', 'ext': 'mp4',
+                                    'vcodec': None}])
+    assert video['format_id'] == 'mp4'
+    assert audio is None
+
+
+def test_select_formats_rejects_audio_only_lists():
+    with pytest.raises(ValueError):
+        select_formats([{'format_id': 'a', 'vcodec': 'none', 'acodec': 'opus'}])
+
+
+def _write_completed_download(directory, url, audio=True):
+    download_dir = os.path.join(directory, "Stand-clip")
+    os.makedirs(download_dir)
+    manifest = {'url': url, 'status': 'complete', 'video': "video.mp4"}
+    with open(os.path.join(download_dir, "video.mp4"), "wb") as f:
+        f.write(CLIP)
+    if audio:
+        manifest['audio'] = "audio.m4a"
+        with open(os.path.join(download_dir, "audio.m4a"), "wb") as f:
+            f.write(CLIP[:1024])
+    with open(os.path.join(download_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return download_dir
+
+
+def test_reuses_completed_download_without_contacting_the_host(tmp_path, media_server):
+    url = media_server.add("/clip.mp4", CLIP)
+    download_dir = _write_completed_download(str(tmp_path), url)
+    events = []
+
+    video_path = DownloadManager(str(tmp_path)).download(url, on_audio=lambda path: events.append(path))
+
+    assert video_path == os.path.join(download_dir, "video.mp4")
+    assert events == [os.path.join(download_dir, "audio.m4a")]
+    assert media_server.requests == []
+    assert downloaded_audio_for(video_path) == os.path.join(download_dir, "audio.m4a")
+
+
+def test_on_audio_errors_do_not_fail_the_download(tmp_path, media_server):
+    url = media_server.add("/clip.mp4", CLIP)
+    download_dir = _write_completed_download(str(tmp_path), url)
+
+    def on_audio(path):
+        raise RuntimeError("transcription failed")
+
+    assert DownloadManager(str(tmp_path)).download(url, on_audio=on_audio) == os.path.join(download_dir, "video.mp4")
+
+
+def test_downloads_direct_link_once(tmp_path, media_server):
+    pytest.importorskip("yt_dlp")
+    url = media_server.add("/clip.mp4", CLIP)
+    manager = DownloadManager(str(tmp_path))
+    audio_calls = []
+
+    video_path = manager.download(url, on_audio=audio_calls.append)
+
+    with open(video_path, "rb") as f:
+        assert f.read() == CLIP
+    with open(os.path.join(os.path.dirname(video_path), MANIFEST_NAME), encoding="utf-8") as f:
+        assert json.load(f)['status'] == 'complete'
+    # A progressive format has no separate audio track to hand over early
+    assert audio_calls == []
+
+    requests_after_first = len(media_server.requests)
+    assert manager.download(url) == video_path
+    assert len(media_server.requests) == requests_after_first
+
+
+# A video-only format with no audio formats offered is a silent video: nothing to merge it with
+def test_downloads_silent_video_only_format_without_merging(tmp_path, media_server, monkeypatch):
+    pytest.importorskip("yt_dlp")
+    import video_downloads
+
+    def video_only(formats, target_resolution):
+        video, _ = select_formats(formats, target_resolution)
+        return dict(video, acodec='none'), None
+
+    monkeypatch.setattr(video_downloads, "select_formats", video_only)
+    url = media_server.add("/clip.mp4", CLIP)
+
+    video_path = DownloadManager(str(tmp_path)).download(url)
+
+    with open(video_path, "rb") as f:
+        assert f.read() == CLIP
+    assert os.path.basename(video_path).startswith("video_only")
+
+
+def test_resumes_partial_download(tmp_path, media_server):
+    yt_dlp = pytest.importorskip("yt_dlp")
+    url = media_server.add("/clip.mp4", CLIP)
+    manager = DownloadManager(str(tmp_path))
+    with yt_dlp.YoutubeDL(manager._ydl_options()) as ydl:
+        info = ydl.extract_info(url, download=False)
+    download_dir = os.path.join(str(tmp_path), DownloadManager.download_key(info))
+    os.makedirs(download_dir)
+    half = len(CLIP) // 2
+    with open(os.path.join(download_dir, f"video.{info['ext']}.part"), "wb") as f:
+        f.write(CLIP[:half])
+
+    video_path = manager.download(url)
+
+    with open(video_path, "rb") as f:
+        assert f.read() == CLIP
+    assert ('GET', "/clip.mp4", f"bytes={half}-") in media_server.requests
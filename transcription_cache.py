@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+
+from content_hash import hash_file
+
+CACHE_DIR = "transcription_cache"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+# On-disk cache of Whisper segments keyed by input content, model name and options.
+# Entries are evicted least-recently-used first once the cache grows past max_bytes.
+class TranscriptionCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, input_path, model_name, options=None):
+        payload = json.dumps({
+            'content': hash_file(input_path),
+            'model': model_name,
+            'options': options or {},
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        entry_path = self._entry_path(key)
+        with self._lock:
+            try:
+                with open(entry_path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                # Touch the entry so eviction sees it as recently used
+                os.utime(entry_path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except (OSError, ValueError) as e:
+                print(f"Discarding unreadable transcription cache entry {entry_path}: {e}")
+                self._remove(entry_path)
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry['segments'], entry['full_text']
+
+    def put(self, key, segments, full_text):
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({'segments': segments, 'full_text': full_text}, f)
+            os.replace(tmp_path, entry_path)
+            self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            total_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            entries = self._entries()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+            }
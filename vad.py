@@ -0,0 +1,208 @@
+import argparse
+import bisect
+import time
+import wave
+
+import ffmpeg
+import numpy as np
+
+from audio_io import SAMPLE_RATE, audio_duration, load_audio_pcm, pcm_to_float32, read_audio_window
+
+FRAME_SECONDS = 0.02
+# A frame is voiced when it is this far above the noise floor (the 10th percentile of frame levels)
+ENERGY_MARGIN_DB = 12.0
+# Frames quieter than this are silence whatever the noise floor
+ABSOLUTE_FLOOR_DB = -50.0
+# Speech swings in level syllable by syllable; sound that stays steadier than this over the window
+# (music beds, hum, room tone) is skipped along with silence
+MODULATION_WINDOW_SECONDS = 1.0
+MIN_MODULATION_DB = 4.0
+MIN_SPEECH_SECONDS = 0.3
+MIN_SILENCE_SECONDS = 0.6
+PADDING_SECONDS = 0.25
+# Silence kept between regions in the compacted audio so Whisper still hears the pauses
+GAP_SECONDS = 0.3
+# Decoded samples per pipe read when scanning audio from a file
+STREAM_CHUNK_SECONDS = 60.0
+
+
+# Level of each FRAME_SECONDS frame in dBFS
+def frame_levels(samples, frame_samples):
+    count = len(samples) // frame_samples
+    frames = samples[:count * frame_samples].reshape(count, frame_samples)
+    mean_square = np.einsum('ij,ij->i', frames, frames) / frame_samples
+    return 10.0 * np.log10(mean_square + 1e-10)
+
+
+# Frame levels of a media file, decoded through an ffmpeg pipe one chunk at a time
+def _stream_frame_levels(path, frame_samples):
+    process = (
+        ffmpeg.input(path)
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=SAMPLE_RATE)
+        .global_args('-loglevel', 'error')
+        .run_async(pipe_stdout=True)
+    )
+    chunk_bytes = int(STREAM_CHUNK_SECONDS / FRAME_SECONDS) * frame_samples * 2
+    levels = []
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            levels.append(frame_levels(pcm_to_float32(data), frame_samples))
+    finally:
+        process.stdout.close()
+        process.wait()
+    return np.concatenate(levels) if levels else np.zeros(0)
+
+
+# Standard deviation of the levels over a window centred on each frame
+def _rolling_std(levels, window):
+    padded = np.pad(levels, (window // 2, window - window // 2 - 1), mode='edge')
+    sums = np.concatenate(([0.0], np.cumsum(padded)))
+    squares = np.concatenate(([0.0], np.cumsum(padded * padded)))
+    mean = (sums[window:] - sums[:-window]) / window
+    variance = (squares[window:] - squares[:-window]) / window - mean * mean
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+# Runs of True in a boolean mask as (first, last + 1) index pairs
+def _runs(mask):
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+# Speech regions of a 16 kHz buffer or a media file as (start, end) seconds in source time
+def detect_speech(source, reject_steady=True):
+    frame_samples = int(FRAME_SECONDS * SAMPLE_RATE)
+    if isinstance(source, np.ndarray):
+        levels = frame_levels(source, frame_samples)
+    else:
+        levels = _stream_frame_levels(source, frame_samples)
+    if levels.size == 0:
+        return []
+
+    threshold = max(np.percentile(levels, 10) + ENERGY_MARGIN_DB, ABSOLUTE_FLOOR_DB)
+    speech = levels > threshold
+    if reject_steady:
+        window = max(1, int(MODULATION_WINDOW_SECONDS / FRAME_SECONDS))
+        speech &= _rolling_std(levels, window) >= MIN_MODULATION_DB
+
+    duration = len(levels) * FRAME_SECONDS
+    regions = []
+    for first, last in _runs(speech):
+        start, end = float(first * FRAME_SECONDS), float(last * FRAME_SECONDS)
+        # Bridge short pauses so sentences stay in one region
+        if regions and start - regions[-1][1] < MIN_SILENCE_SECONDS:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    padded = []
+    for start, end in regions:
+        if end - start < MIN_SPEECH_SECONDS:
+            continue
+        start, end = max(0.0, start - PADDING_SECONDS), min(duration, end + PADDING_SECONDS)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+    return padded
+
+
+# Maps times in the compacted speech-only audio (regions back to back, GAP_SECONDS apart) to source time
+class SpeechTimeline:
+    def __init__(self, regions, gap_seconds=GAP_SECONDS):
+        self.regions = list(regions)
+        self.gap_seconds = gap_seconds
+        self.compact_starts = []
+        position = 0.0
+        for start, end in self.regions:
+            self.compact_starts.append(position)
+            position += (end - start) + gap_seconds
+        self.compact_duration = max(0.0, position - gap_seconds)
+        self.speech_duration = sum(end - start for start, end in self.regions)
+
+    # A time inside a gap maps to the next region's start, or for an end time to the previous region's end
+    def to_source(self, t, is_end=False):
+        if not self.regions:
+            return t
+        i = max(0, bisect.bisect_right(self.compact_starts, t) - 1)
+        start, end = self.regions[i]
+        offset = t - self.compact_starts[i]
+        if offset <= end - start:
+            return start + max(0.0, offset)
+        if is_end or i + 1 == len(self.regions):
+            return end
+        return self.regions[i + 1][0]
+
+    def remap_segments(self, segments):
+        for segment in segments:
+            start = self.to_source(segment['start'])
+            end = max(start, self.to_source(segment['end'], is_end=True))
+            yield dict(segment, start=start, end=end)
+
+
+# Copy the speech regions of a buffer or media file into one buffer, GAP_SECONDS of silence apart.
+# With output_path the compacted audio is written there as a 16 kHz WAV one region at a time instead,
+# for inputs too large to hold in memory, and the path is returned.
+def compact_speech(source, timeline, output_path=None):
+    if output_path is None:
+        compact = np.zeros(int(round(timeline.compact_duration * SAMPLE_RATE)) + 1, dtype=np.float32)
+        for (start, end), compact_start in zip(timeline.regions, timeline.compact_starts):
+            samples = read_audio_window(source, start, end - start)
+            first = int(round(compact_start * SAMPLE_RATE))
+            samples = samples[:len(compact) - first]
+            compact[first:first + len(samples)] = samples
+        return compact
+
+    with wave.open(output_path, "wb") as output:
+        output.setnchannels(1)
+        output.setsampwidth(2)
+        output.setframerate(SAMPLE_RATE)
+        written = 0
+        for (start, end), compact_start in zip(timeline.regions, timeline.compact_starts):
+            first = int(round(compact_start * SAMPLE_RATE))
+            if first > written:
+                output.writeframes(bytes(2 * (first - written)))
+                written = first
+            samples = read_audio_window(source, start, end - start)
+            output.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+            written += len(samples)
+    return output_path
+
+
+# Benchmark: how much of a file the pre-pass skips, how long it takes, and (with a model) the real
+# transcription speedup and how much the transcript changes
+def run_benchmark(audio_path, model_name=None):
+    audio = load_audio_pcm(audio_path)
+    duration = audio_duration(audio)
+
+    start_time = time.perf_counter()
+    timeline = SpeechTimeline(detect_speech(audio))
+    vad_seconds = time.perf_counter() - start_time
+    skipped = 1.0 - timeline.speech_duration / duration if duration else 0.0
+    print(f"Audio: {duration:.1f}s, speech: {timeline.speech_duration:.1f}s in {len(timeline.regions)} regions")
+    print(f"Skipped {skipped:.1%} of the audio; VAD took {vad_seconds * 1000:.0f} ms ({duration / vad_seconds:.0f}x realtime)")
+    if not model_name:
+        return
+
+    from model_registry import transcribe_with_whisper, word_error_rate
+
+    start_time = time.perf_counter()
+    full_text = transcribe_with_whisper(audio, model_name)['text']
+    full_seconds = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    compact_text = transcribe_with_whisper(compact_speech(audio, timeline), model_name)['text']
+    compact_seconds = time.perf_counter() - start_time + vad_seconds
+    print(f"Full transcription: {full_seconds:.1f}s, with VAD: {compact_seconds:.1f}s "
+          f"(speedup {full_seconds / compact_seconds:.2f}x)")
+    print(f"WER of the VAD transcript against the full one: {word_error_rate(full_text, compact_text):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the energy VAD pre-pass on an audio file")
+    parser.add_argument("audio_path")
+    parser.add_argument("--model", default=None, help="also transcribe with this Whisper model to measure the speedup")
+    args = parser.parse_args()
+    run_benchmark(args.audio_path, args.model)
@@ -0,0 +1,256 @@
+import json
+import os
+import re
+import threading
+
+DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "downloaded_videos")
+# Reels are at most 1080 wide; the smallest format whose short side reaches this is downloaded
+TARGET_RESOLUTION = int(os.getenv("DOWNLOAD_TARGET_RESOLUTION", "720"))
+# Smallest audio-only format at or above this bitrate (kbit/s); it is both transcribed and muxed into the video
+MIN_AUDIO_BITRATE = 96
+MANIFEST_NAME = "download.json"
+
+
+# Short side of a video format, so portrait videos are judged like landscape ones
+def format_resolution(fmt):
+    sides = [side for side in (fmt.get('width'), fmt.get('height')) if side]
+    return min(sides) if sides else 0
+
+
+# Extractors leave a codec out when they do not know it (direct links, the generic extractor); only
+# 'none' says the format lacks that track
+def _has_video(fmt):
+    return fmt.get('vcodec') != 'none'
+
+
+def _has_audio(fmt):
+    return fmt.get('acodec') != 'none'
+
+
+# Formats without a size sort after those with one, then by bitrate
+def _size_key(fmt):
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    return (size is None, size or 0, fmt.get('tbr') or 0)
+
+
+# Pick the formats to download from an extractor's format list: the smallest video format that reaches
+# target_resolution (the largest one when none does) and the smallest audio-only format of at least
+# MIN_AUDIO_BITRATE. Returns (video_format, audio_format); audio_format is None when the extractor only
+# offers formats with audio and video together.
+def select_formats(formats, target_resolution=TARGET_RESOLUTION):
+    audios = [fmt for fmt in formats if _has_audio(fmt) and not _has_video(fmt)]
+    videos = [fmt for fmt in formats if _has_video(fmt)]
+    # Video-only formats need an audio-only one muxed in
+    if not audios:
+        videos = [fmt for fmt in videos if _has_audio(fmt)] or videos
+    if not videos:
+        raise ValueError("No video formats available")
+
+    large_enough = [fmt for fmt in videos if format_resolution(fmt) >= target_resolution]
+    if not large_enough:
+        best = max(format_resolution(fmt) for fmt in videos)
+        large_enough = [fmt for fmt in videos if format_resolution(fmt) == best]
+    video = min(large_enough, key=_size_key)
+
+    audio = None
+    if audios:
+        good_audio = [fmt for fmt in audios if (fmt.get('abr') or fmt.get('tbr') or 0) >= MIN_AUDIO_BITRATE]
+        audio = min(good_audio, key=_size_key) if good_audio else max(audios, key=lambda fmt: fmt.get('abr') or 0)
+    return video, audio
+
+
+# Whether a job's input is a URL to download rather than a local file
+def is_url(source):
+    return re.match(r"^https?://", source) is not None
+
+
+def _safe_name(text):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", text)
+
+
+# Downloads videos into one directory per extractor and video ID, e.g. downloaded_videos/Youtube-<id>/.
+# A finished download is recorded in the directory's manifest and reused; an interrupted one resumes from
+# yt_dlp's .part files. The audio track is fetched first, so callers can start transcribing it while
+# the video is still downloading.
+class DownloadManager:
+    def __init__(self, directory=DOWNLOAD_DIR, target_resolution=TARGET_RESOLUTION):
+        self.directory = directory
+        self.target_resolution = target_resolution
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _ydl_options(self, **options):
+        return dict({'quiet': True, 'noplaylist': True, 'continuedl': True, 'noprogress': True}, **options)
+
+    def _lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _read_manifest(self, download_dir):
+        try:
+            with open(os.path.join(download_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, download_dir, manifest):
+        path = os.path.join(download_dir, MANIFEST_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    # Download one format into download_dir/<name>.<ext>, resuming a partial file; returns the path
+    def _download_format(self, ydl_class, info, fmt, download_dir, name):
+        path = os.path.join(download_dir, f"{name}.{fmt['ext']}")
+        if os.path.exists(path):
+            return path
+        options = self._ydl_options(format=fmt['format_id'], outtmpl=os.path.join(download_dir, f"{name}.%(ext)s"))
+        with ydl_class(options) as ydl:
+            ydl.process_ie_result(dict(info), download=True)
+        return path
+
+    # Mux a video-only download with the audio-only one without re-encoding
+    def _merge(self, video_path, audio_path, download_dir):
+        import ffmpeg
+
+        mp4_audio = os.path.splitext(audio_path)[1] in (".m4a", ".mp4")
+        extension = "mp4" if video_path.endswith(".mp4") and mp4_audio else "mkv"
+        output_path = os.path.join(download_dir, f"video.{extension}")
+        temp_path = os.path.join(download_dir, f"merging.{extension}")
+        (
+            ffmpeg.output(ffmpeg.input(video_path).video, ffmpeg.input(audio_path).audio, temp_path, c='copy')
+            .global_args('-loglevel', 'error')
+            .run(overwrite_output=True)
+        )
+        os.replace(temp_path, output_path)
+        os.remove(video_path)
+        return output_path
+
+    # Manifest of the finished download in download_dir, or None
+    def _completed_manifest(self, download_dir):
+        manifest = self._read_manifest(download_dir)
+        if manifest.get('status') == 'complete' and os.path.exists(os.path.join(download_dir, manifest['video'])):
+            return manifest
+        return None
+
+    # Directory of a finished download of exactly this URL, found without asking the extractor
+    def _find_completed_url(self, url):
+        if not os.path.isdir(self.directory):
+            return None
+        for name in os.listdir(self.directory):
+            download_dir = os.path.join(self.directory, name)
+            manifest = self._completed_manifest(download_dir)
+            if manifest and manifest.get('url') == url:
+                return download_dir
+        return None
+
+    # Hand the audio track to the caller; its work is an optimization, so a failure does not fail the download
+    def _notify_audio(self, on_audio, audio_path):
+        try:
+            on_audio(audio_path)
+        except Exception as e:
+            print(f"Error handling downloaded audio {audio_path}: {e}")
+
+    def _reuse(self, url, download_dir, on_audio):
+        manifest = self._completed_manifest(download_dir)
+        print(f"Reusing download of {url} in {download_dir}")
+        if on_audio and manifest.get('audio'):
+            self._notify_audio(on_audio, os.path.join(download_dir, manifest['audio']))
+        return os.path.join(download_dir, manifest['video'])
+
+    @staticmethod
+    def download_key(info):
+        return _safe_name(f"{info.get('extractor_key') or info.get('extractor') or 'generic'}-{info['id']}")
+
+    # Download url and return the path of the video file. on_audio(audio_path), if given, is called as soon
+    # as the audio track is on disk and runs in the caller's thread while the video downloads on another;
+    # its errors are logged, not raised.
+    def download(self, url, on_audio=None):
+        download_dir = self._find_completed_url(url)
+        if download_dir:
+            return self._reuse(url, download_dir, on_audio)
+
+        import yt_dlp
+
+        with yt_dlp.YoutubeDL(self._ydl_options()) as ydl:
+            info = ydl.extract_info(url, download=False)
+        key = self.download_key(info)
+        download_dir = os.path.join(self.directory, key)
+
+        with self._lock(key):
+            # Another URL for the same video (a short link, a timestamp) may have downloaded it already
+            if self._completed_manifest(download_dir):
+                return self._reuse(url, download_dir, on_audio)
+
+            os.makedirs(download_dir, exist_ok=True)
+            video_format, audio_format = select_formats(info.get('formats') or [info], self.target_resolution)
+            manifest = {'url': url, 'title': info.get('title'), 'status': 'downloading',
+                        'video_format': video_format.get('format_id'),
+                        'audio_format': audio_format.get('format_id') if audio_format else None}
+            self._write_manifest(download_dir, manifest)
+            print(f"Downloading {url}: {format_resolution(video_format)}p video "
+                  f"({video_format.get('format_id')}), audio {manifest['audio_format']}")
+
+            audio_path = None
+            if audio_format is not None:
+                audio_path = self._download_format(yt_dlp.YoutubeDL, info, audio_format, download_dir, "audio")
+                manifest['audio'] = os.path.basename(audio_path)
+                self._write_manifest(download_dir, manifest)
+
+            result = {}
+
+            def download_video():
+                try:
+                    video_path = self._download_format(yt_dlp.YoutubeDL, info, video_format, download_dir,
+                                                       "video" if _has_audio(video_format) else "video_only")
+                    # A video-only format is merged with the audio track, if the video has one
+                    if not _has_audio(video_format) and audio_path:
+                        video_path = self._merge(video_path, audio_path, download_dir)
+                    result['video'] = video_path
+                except Exception as e:
+                    result['error'] = e
+
+            if on_audio and audio_path:
+                thread = threading.Thread(target=download_video, daemon=True, name=f"download-{key}")
+                thread.start()
+                try:
+                    self._notify_audio(on_audio, audio_path)
+                finally:
+                    thread.join()
+            else:
+                download_video()
+            if 'error' in result:
+                raise result['error']
+
+            manifest['video'] = os.path.basename(result['video'])
+            manifest['status'] = 'complete'
+            self._write_manifest(download_dir, manifest)
+            return result['video']
+
+
+# The audio track a video was downloaded with, if the download manager fetched it; transcribing it
+# gives the same transcript as the video's own track
+def downloaded_audio_for(video_path):
+    download_dir = os.path.dirname(os.path.abspath(video_path))
+    try:
+        with open(os.path.join(download_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('video') != os.path.basename(video_path) or not manifest.get('audio'):
+        return None
+    audio_path = os.path.join(download_dir, manifest['audio'])
+    return audio_path if os.path.exists(audio_path) else None
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+# Process-wide manager, so concurrent requests for one video wait for a single download
+def get_download_manager():
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = DownloadManager()
+        return _default_manager